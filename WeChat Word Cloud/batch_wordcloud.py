@@ -0,0 +1,323 @@
+"""
+微信聊天记录词云批量生成器 - 无界面版
+不弹出窗口、不等待按键，每个JSON文件单独生成词云、词频统计和汇总图，
+适合在服务器或定时任务中无人值守地处理大量聊天记录
+
+用法示例:
+    python batch_wordcloud.py exports/ -o wordcloud_output
+    python batch_wordcloud.py a.json b.json "exports/*.json" --who me --workers 4
+    python batch_wordcloud.py exports/ --count-only   # 只保存词频统计，不生成图片
+    python batch_wordcloud.py exports/ --list         # 只列出会处理的文件
+
+退出码: 0=全部成功，1=部分文件失败，2=没有找到文件或没有生成任何词云
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import wordcloud_core as core
+
+# 无界面后端；matplotlib 到生成汇总图时才导入，在那之前设置即可
+os.environ["MPLBACKEND"] = "Agg"
+
+# ============================================
+# 第一部分：默认参数（都可以用命令行参数覆盖）
+# ============================================
+
+OUTPUT_DIR = "wordcloud_output"  # 输出文件夹
+ANALYZE_WHO = "all"  # "all"=全部, "me"=自己, "other"=对方
+EXCLUDE_SYSTEM_MESSAGES = True
+RENDER_WORKERS = 1  # 同时生成词云的进程数，0=使用全部CPU核心
+SAVE_SUMMARY_FIGURE = True  # 是否为每个文件保存汇总图（词云 + 高频词排行榜）
+BATCH_SUMMARY = "batch_summary.csv"  # 每个文件的处理结果，保存在输出文件夹中
+
+# 词云设置（与2.0版相同）
+MAX_WORDS = 200
+BACKGROUND_COLOR = "white"
+WIDTH = 1000
+HEIGHT = 800
+FONT_SIZE_RANGE = (8, 120)
+FREQUENCY_EXPONENT = 1.8
+USE_LOG_SCALE = True
+RELATIVE_SCALING = 0.8
+COLOR_SCHEME = "viridis"
+
+STOP_WORDS = [
+    "的", "了", "在", "是", "我", "有", "和", "就",
+    "不", "人", "都", "一", "一个", "上", "也", "很",
+    "到", "说", "要", "去", "你", "会", "着", "没有",
+    "看", "好", "自己", "这", "中", "就是", "对",
+    "可以", "吧", "啦", "吗", "呢", "啊", "呀", "哦",
+    "哈哈", "哈哈哈", "哈哈哈哈", "嘻嘻", "呵呵", "嗯",
+    "这个", "那个", "什么", "怎么", "为什么", "因为",
+    "所以", "但是", "然后", "而且", "其实", "还是",
+]
+
+CUSTOM_WORDS = []  # 自定义词语（人名、昵称、常用语等），分词时保持完整
+
+REMOVE_PATTERNS = [
+    r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+',
+    r'\[.*?\]',
+    r'【.*?】',
+    r'#.*?#',
+    r'<.*?>',
+]
+
+# 退出码
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_NOTHING_DONE = 2
+
+REMOVE_REGEX = core.compile_remove_patterns(REMOVE_PATTERNS)
+
+# ============================================
+# 第二部分：命令行参数和输入文件
+# ============================================
+
+def parse_args(argv=None):
+    """
+    解析命令行参数
+    """
+    parser = argparse.ArgumentParser(
+        description="无界面批量生成微信聊天记录词云，每个JSON文件单独输出")
+    parser.add_argument("inputs", nargs="+",
+                        help="聊天记录JSON文件、文件夹（处理其中所有 *.json）或通配符")
+    parser.add_argument("-o", "--output-dir", default=OUTPUT_DIR, help=f"输出文件夹（默认 {OUTPUT_DIR}）")
+    parser.add_argument("--who", choices=sorted(core.VIEW_NAMES), default=ANALYZE_WHO,
+                        help=f"分析谁的消息（默认 {ANALYZE_WHO}）")
+    parser.add_argument("--include-system", action="store_true", help="不排除系统消息")
+    parser.add_argument("--max-words", type=int, default=MAX_WORDS, help=f"每张词云最多显示的词数（默认 {MAX_WORDS}）")
+    parser.add_argument("--workers", type=int, default=RENDER_WORKERS,
+                        help=f"同时生成词云的进程数，0=使用全部CPU核心（默认 {RENDER_WORKERS}）")
+    parser.add_argument("--stop-words-file", action="append", default=[],
+                        help="停用词文件（每行一个词，# 开头为注释），可以重复指定")
+    parser.add_argument("--parquet", action="store_true",
+                        help="同时保存 Parquet 格式的词频统计（需要安装 pyarrow）")
+    parser.add_argument("--no-summary", action="store_true", help="不保存汇总图，只保存词云和词频统计")
+    parser.add_argument("--count-only", action="store_true",
+                        help="只统计并保存词频，不生成词云和汇总图（不加载 wordcloud 和 matplotlib）")
+    parser.add_argument("--list", action="store_true", help="只列出会处理的文件，不做统计")
+    return parser.parse_args(argv)
+
+def collect_input_files(inputs, output_dir):
+    """
+    把命令行给出的文件、文件夹和通配符展开成JSON文件列表（去重，保持给出的顺序）
+    输出文件夹中的文件（如上次运行的结果）不会被当作输入
+    """
+    output_dir = os.path.abspath(output_dir)
+    json_files = []
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(item, "*.json")))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item))
+        else:
+            matches = [item]
+        for path in matches:
+            full_path = os.path.abspath(path)
+            if full_path in seen or os.path.dirname(full_path) == output_dir:
+                continue
+            seen.add(full_path)
+            json_files.append(path)
+    return json_files
+
+def get_output_names(json_files):
+    """
+    每个输入文件的输出文件名前缀（去掉扩展名和不能用于文件名的字符），
+    不同文件夹中同名的文件按顺序加上 _2、_3 …，每次运行都相同
+    """
+    names = []
+    used = set()
+    for path in json_files:
+        base = core.get_render_filename(os.path.splitext(os.path.basename(path))[0])[:-len(".png")]
+        name = base
+        suffix = 2
+        while name in used:
+            name = f"{base}_{suffix}"
+            suffix += 1
+        used.add(name)
+        names.append(name)
+    return names
+
+# ============================================
+# 第三部分：统计和输出
+# ============================================
+
+def count_chat_file(json_file, who, exclude_system, stop_words):
+    """
+    流式读取一个聊天记录文件并统计词频
+    返回 (词频, 消息统计)，文件格式不对时抛出 ValueError
+    """
+    stream = core.ChatFileStream(json_file)
+    stats = core.new_message_stats()
+    rows = core.iter_filtered_messages(stream, who=who, exclude_system=exclude_system, stats=stats)
+    view_counts = core.count_words_by_view(rows, [who], REMOVE_REGEX, stop_words)
+    if not stream.has_messages:
+        raise ValueError("JSON文件中没有找到'messages'字段")
+    return view_counts[who], stats
+
+def save_summary_figure(output_image, word_counts, title, summary_image):
+    """
+    读取已生成的词云图片，与高频词排行榜一起保存成汇总图
+    """
+    import matplotlib.pyplot as plt
+
+    params_text = (f"参数设置:\n"
+                   f"字体大小: {FONT_SIZE_RANGE[0]}-{FONT_SIZE_RANGE[1]}\n"
+                   f"词频指数: {FREQUENCY_EXPONENT}\n"
+                   f"对数缩放: {USE_LOG_SCALE}\n"
+                   f"相对缩放: {RELATIVE_SCALING}")
+    core.display_enhanced_wordcloud(plt.imread(output_image), word_counts, title, params_text,
+                                    output_image=summary_image)
+
+def save_batch_summary(results, output_path):
+    """
+    保存每个文件的处理结果
+    """
+    try:
+        core.write_frequency_csv(results, ['文件', '状态', '总消息数', '有效消息数', '不同词语数',
+                                           '词云图片', '说明'], output_path)
+        print(f"处理结果已保存: {output_path}")
+    except Exception as e:
+        print(f"保存处理结果失败: {e}")
+
+# ============================================
+# 第四部分：主程序
+# ============================================
+
+def main(argv=None):
+    """
+    主函数，返回退出码
+    """
+    args = parse_args(argv)
+    start_time = time.perf_counter()
+
+    json_files = collect_input_files(args.inputs, args.output_dir)
+    missing = [path for path in json_files if not os.path.isfile(path)]
+    json_files = [path for path in json_files if os.path.isfile(path)]
+    for path in missing:
+        print(f"错误：找不到文件 '{path}'")
+    if not json_files:
+        print("错误：没有找到要处理的JSON文件")
+        return EXIT_NOTHING_DONE
+
+    if args.list:
+        for path, name in zip(json_files, get_output_names(json_files)):
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"{path}\t{size_mb:.1f} MB\t{name}")
+        return EXIT_PARTIAL if missing else EXIT_OK
+
+    try:
+        os.makedirs(args.output_dir, exist_ok=True)
+    except OSError as e:
+        print(f"错误：无法创建输出文件夹 {args.output_dir}: {e}")
+        return EXIT_NOTHING_DONE
+
+    stop_words = core.build_stop_words(STOP_WORDS, args.stop_words_file)
+    core.init_jieba(core.get_dictionary_words(CUSTOM_WORDS, stop_words))
+    exclude_system = EXCLUDE_SYSTEM_MESSAGES and not args.include_system
+
+    print("=" * 60)
+    print("微信聊天记录词云批量生成器 - 无界面版")
+    print("=" * 60)
+    print(f"输入文件: {len(json_files)} 个")
+    print(f"输出文件夹: {args.output_dir}")
+    print(f"分析对象: {core.VIEW_NAMES[args.who]}")
+    print("=" * 60)
+
+    # 1. 逐个文件统计词频并保存词频统计（一个文件出错不影响其他文件）
+    results = [[path, "失败", 0, 0, 0, "", "找不到文件"] for path in missing]
+    jobs = []
+    for index, (json_file, name) in enumerate(zip(json_files, get_output_names(json_files)), 1):
+        print(f"\n[{index}/{len(json_files)}] {json_file}")
+        result = [json_file, "失败", 0, 0, 0, "", ""]
+        results.append(result)
+        try:
+            word_counts, stats = count_chat_file(json_file, args.who, exclude_system, stop_words)
+        except Exception as e:
+            print(f"  处理失败: {e}")
+            result[6] = str(e)
+            continue
+
+        result[2:5] = [stats['total'], stats['valid'], len(word_counts)]
+        if not word_counts:
+            print("  没有可用于生成词云的词语，跳过")
+            result[1] = "跳过"
+            result[6] = "没有有效词语"
+            continue
+
+        output_stats = os.path.join(args.output_dir, f"{name}_word_frequency.csv")
+        try:
+            core.save_frequency_table(word_counts.most_common(), ['词语', '频次'], output_stats,
+                                      args.parquet)
+        except Exception as e:
+            print(f"  保存词频统计失败: {e}")
+            result[6] = str(e)
+            continue
+
+        if args.count_only:
+            result[1] = "成功"
+            continue
+
+        output_image = os.path.join(args.output_dir, f"{name}.png")
+        jobs.append((word_counts, output_image, result))
+
+    # 2. 批量生成词云图片（可以多进程并行）
+    if jobs:
+        font_path = core.find_chinese_font()
+        render_options = {
+            'font_path': font_path,
+            'max_words': args.max_words,
+            'background_color': BACKGROUND_COLOR,
+            'width': WIDTH,
+            'height': HEIGHT,
+            'font_size_range': FONT_SIZE_RANGE,
+            'exponent': FREQUENCY_EXPONENT,
+            'use_log_scale': USE_LOG_SCALE,
+            'relative_scaling': RELATIVE_SCALING,
+            'colormap': COLOR_SCHEME,
+        }
+        workers = args.workers or None
+        print(f"\n正在生成 {len(jobs)} 张词云 (进程数: {workers or os.cpu_count()})...")
+        render_jobs = [(word_counts, output_image) for word_counts, output_image, _ in jobs]
+        rendered = core.render_wordclouds(render_jobs, workers, **render_options)
+        for (word_counts, output_image, result), (_, error) in zip(jobs, rendered):
+            if error is not None:
+                print(f"  生成 {output_image} 失败: {error}")
+                result[6] = f"生成词云失败: {error}"
+                continue
+            print(f"  ✓ {output_image}")
+            result[1] = "成功"
+            result[5] = output_image
+
+            # 3. 汇总图直接保存成文件，不弹出窗口
+            if SAVE_SUMMARY_FIGURE and not args.no_summary:
+                summary_image = os.path.splitext(output_image)[0] + "_summary.png"
+                title = f"{os.path.basename(result[0])} - {core.VIEW_NAMES[args.who]}"
+                try:
+                    save_summary_figure(output_image, word_counts, title, summary_image)
+                except Exception as e:
+                    print(f"  保存汇总图失败: {e}")
+                    result[6] = f"保存汇总图失败: {e}"
+
+    save_batch_summary(results, os.path.join(args.output_dir, BATCH_SUMMARY))
+
+    succeeded = sum(1 for result in results if result[1] == "成功")
+    failed = sum(1 for result in results if result[1] == "失败")
+    skipped = len(results) - succeeded - failed
+    print("\n" + "=" * 60)
+    print(f"处理完成，用时 {time.perf_counter() - start_time:.1f} 秒")
+    print(f"  成功: {succeeded} 个，跳过: {skipped} 个，失败: {failed} 个")
+    print("=" * 60)
+
+    if not succeeded:
+        return EXIT_NOTHING_DONE
+    return EXIT_PARTIAL if failed else EXIT_OK
+
+# 运行主程序
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,671 @@
+"""
+词云脚本性能测试
+1. 对比各处理步骤新旧实现的速度，并检查结果是否一致
+2. 生成不同规模的模拟微信聊天记录，测试整条处理流程各阶段的吞吐量，
+   与保存的基准结果对比（不需要真实的聊天记录）
+"""
+
+import importlib.util
+import io
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from itertools import accumulate
+from multiprocessing import get_context
+
+import wordcloud_core as core
+
+# ============================================
+# 第一部分：设置参数
+# ============================================
+
+SAMPLE_SIZE = 200000  # 测试用的消息条数
+REPEAT = 3            # 每项测试重复次数，取最快的一次
+RANDOM_SEED = 42
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+RUN_CLEAN_BENCH = True     # 是否测试文本清洗的新旧实现
+RUN_FILTER_BENCH = True    # 是否测试词语过滤（停用词、非中文词）的新旧实现
+RUN_STARTUP_BENCH = True   # 是否测试分词词典的启动耗时（jieba自带缓存 / 词典缓存）
+RUN_IMPORT_BENCH = True    # 是否报告各脚本的导入耗时（python -X importtime）
+RUN_PIPELINE_BENCH = True  # 是否测试整条处理流程
+
+# 整条流程测试的消息规模，可以加上 1000000、10000000（生成和处理都需要较长时间）
+PIPELINE_SIZES = [10000, 100000]
+# 要测试的流程：multi=multi_chat_wordcloud.py，v2=wechat_wordcloud2.0.py，
+# stream=wechat_wordcloud2.0.py 的全程流式处理（STREAM_PIPELINE = True）
+PIPELINES = ["multi", "v2", "stream"]
+
+# 导入耗时报告：要测试的模块，以及每个模块列出的最慢的几个导入
+IMPORT_MODULES = ["wordcloud_core", "multi_chat_wordcloud", "batch_wordcloud"]
+IMPORT_TOP_N = 5
+# 处理聊天记录时才用到的库，对比“启动时全部导入”要多等多久
+HEAVY_MODULES = ["jieba", "numpy", "matplotlib.pyplot", "wordcloud", "pandas"]
+
+# 模拟聊天记录和测试结果都放在子文件夹中，multi脚本扫描当前文件夹的JSON文件时不会把它们当作聊天记录
+BENCH_DATA_DIR = os.path.join(SCRIPT_DIR, "benchmark_data")  # 模拟聊天记录的存放位置，生成一次后重复使用
+BASELINE_FILE = os.path.join(BENCH_DATA_DIR, "benchmark_baseline.json")  # 基准结果
+RESULTS_FILE = os.path.join(BENCH_DATA_DIR, "benchmark_results.json")    # 最近一次的结果
+SAVE_BASELINE = False  # True=把本次结果保存为新的基准；没有基准文件时总会保存
+
+# 模拟聊天记录的设置
+SYNTHETIC_SENDERS = 50         # 群聊中除自己以外的发送人数
+SYNTHETIC_VOCABULARY = 20000   # 模拟词汇量，词频按齐普夫分布
+SELF_MESSAGE_RATIO = 0.3       # 自己发送的消息比例
+SYSTEM_MESSAGE_RATIO = 0.03    # 系统消息比例
+
+# ============================================
+# 第二部分：测试数据和工具函数
+# ============================================
+
+SAMPLE_PIECES = [
+    "今天天气不错，我们出去走走吧",
+    "哈哈哈笑死我了",
+    "晚上一起吃火锅怎么样",
+    "收到，我明天把文件发给你",
+    "[微笑]",
+    "[捂脸][捂脸]",
+    "【通知】下周一开会",
+    "#周末去哪儿#",
+    "<a href='x'>链接</a>",
+    "https://mp.weixin.qq.com/s/AbCdEf123",
+    "http://example.com/page?id=1",
+    "微信转账表情",
+    "视频通话聊天",
+    "语音消息",
+    "OK no problem",
+    "2024年1月1日",
+    "  \n  ",
+    # 几个排除模式的匹配有重叠（链接吃掉了后面的括号），清洗结果取决于模式的先后顺序
+    "[分享 https://b23.tv/AbC] 看看",
+    "<转发 http://t.cn/x> 这个",
+]
+
+def make_sample_texts(count, seed=RANDOM_SEED):
+    """
+    随机拼接常见消息片段，生成测试文本
+    """
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        pieces = rng.choices(SAMPLE_PIECES, k=rng.randint(1, 4))
+        texts.append(' '.join(pieces))
+    return texts
+
+def load_script(filename):
+    """
+    按文件路径加载脚本（文件名中带点，不能直接import）
+    """
+    name = os.path.splitext(filename)[0].replace('.', '_')
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def best_time(func, *args):
+    """
+    重复运行 REPEAT 次，返回最快一次的耗时（秒）和结果
+    """
+    best = None
+    result = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def report(name, old_time, new_time, count):
+    print(f"  旧实现: {old_time:.3f} 秒 ({count / old_time:,.0f} 条/秒)")
+    print(f"  新实现: {new_time:.3f} 秒 ({count / new_time:,.0f} 条/秒)")
+    print(f"  {name} 加速比: {old_time / new_time:.2f}x")
+
+def compare_outputs(old_results, new_results, texts):
+    """
+    检查新旧结果是否一致，打印前几个不一致的例子
+    """
+    mismatches = [i for i, (a, b) in enumerate(zip(old_results, new_results)) if a != b]
+    if not mismatches:
+        print("  结果一致 ✓")
+        return True
+
+    print(f"  结果不一致: {len(mismatches)} 条")
+    for i in mismatches[:5]:
+        print(f"    原文: {texts[i]!r}")
+        print(f"    旧: {old_results[i]!r}  新: {new_results[i]!r}")
+    return False
+
+# ============================================
+# 第三部分：文本清洗
+# ============================================
+
+def clean_text_multi_reference(text, remove_patterns):
+    """
+    multi_chat_wordcloud.py 原来的清洗函数（逐个正则替换）
+    """
+    if not isinstance(text, str):
+        return ""
+
+    cleaned = text
+    for pattern in remove_patterns:
+        cleaned = re.sub(pattern, '', cleaned)
+
+    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    return cleaned
+
+def clean_text_v2_reference(text, remove_patterns):
+    """
+    wechat_wordcloud2.0.py 原来的清洗函数（逐个正则替换）
+    """
+    if not isinstance(text, str):
+        return ""
+
+    for pattern in remove_patterns:
+        text = re.sub(pattern, '', text)
+
+    return text.replace('\n', ' ').replace('\r', ' ').strip()
+
+def collapse_spaces(results):
+    """
+    合并连续空白，只比较文字内容（分词时空白本来就会被丢掉）
+    """
+    return [' '.join(text.split()) for text in results]
+
+def bench_clean_text(texts):
+    """
+    对比清洗函数新旧实现
+    """
+    # 2.0 脚本改用公共核心库后，连续空白也会合并成一个空格
+    cases = [
+        ("multi_chat_wordcloud.py", clean_text_multi_reference, False),
+        ("wechat_wordcloud2.0.py", clean_text_v2_reference, True),
+    ]
+
+    all_same = True
+    for filename, reference, ignore_spaces in cases:
+        module = load_script(filename)
+        print(f"\n[文本清洗] {filename}")
+
+        old_time, old_results = best_time(
+            lambda: [reference(text, module.REMOVE_PATTERNS) for text in texts])
+        new_time, new_results = best_time(
+            lambda: [core.clean_text(text, module.REMOVE_REGEX) for text in texts])
+
+        report("清洗", old_time, new_time, len(texts))
+        if ignore_spaces:
+            old_results = collapse_spaces(old_results)
+        all_same = compare_outputs(old_results, new_results, texts) and all_same
+
+    return all_same
+
+# ============================================
+# 第四部分：词语过滤和启动耗时
+# ============================================
+
+def count_tokens_reference(tokens, stop_words):
+    """
+    原来的词语过滤和计数：停用词是列表，每个词都做一次正则匹配
+    """
+    word_counts = Counter()
+    for word in tokens:
+        word = word.strip()
+        if (len(word) > 1 and
+                word not in stop_words and
+                not word.isdigit() and
+                not re.match(r'^[^\u4e00-\u9fa5]+$', word)):
+            word_counts[word] += 1
+    return word_counts
+
+def make_sample_tokens(count, seed=RANDOM_SEED):
+    """
+    对模拟聊天内容分词，得到测试用的词语序列（包括标点、英文、数字和停用词）
+    """
+    rng = random.Random(seed)
+    words, cum_weights = build_vocabulary(rng)
+    contents = [make_message_content(rng, words, cum_weights) for _ in range(count)]
+    contents += [rng.choice(["就是", "哈哈哈", "2024", "OK", "好"]) for _ in range(count // 10)]
+    return [token for tokens in core.tokenize_texts(contents) for token in tokens]
+
+def bench_token_filter(tokens):
+    """
+    对比词语过滤新旧实现，输出每秒处理的词语数
+    """
+    module = load_script("multi_chat_wordcloud.py")
+    print(f"\n[词语过滤] {len(tokens)} 个词语，{len(set(tokens))} 个不同词语")
+
+    old_time, old_counts = best_time(count_tokens_reference, tokens, module.STOP_WORDS)
+    new_time, new_counts = best_time(
+        lambda: core.filter_word_counts(Counter(tokens), module.STOP_WORD_SET))
+
+    report("过滤", old_time, new_time, len(tokens))
+    # 词频和词语的先后顺序都要一致
+    return compare_outputs([list(old_counts.items())], [list(new_counts.items())], ["全部词语"])
+
+def time_jieba_start(mode, cache_dir=None):
+    """
+    在新启动的进程中初始化分词词典，返回耗时（秒）
+    stock=jieba自带的初始化，其他=core.init_jieba（加入 multi 脚本的多字停用词）
+    """
+    import jieba
+    jieba.setLogLevel(60)
+    if mode == "stock":
+        start = time.perf_counter()
+        jieba.initialize()
+        return time.perf_counter() - start
+    module = load_script("multi_chat_wordcloud.py")
+    words = core.get_dictionary_words(module.CUSTOM_WORDS, module.STOP_WORD_SET)
+    return core.init_jieba(words, cache_dir=cache_dir)
+
+def bench_jieba_startup():
+    """
+    对比分词词典的冷启动耗时：每次都在 spawn 启动的新进程中测，不受本进程已加载的词典影响
+    """
+    print("\n[分词词典启动]")
+    context = get_context("spawn")
+
+    def best_start(mode, cache_dir=None):
+        times = []
+        for _ in range(REPEAT):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                times.append(executor.submit(time_jieba_start, mode, cache_dir).result())
+        return min(times)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            build_time = executor.submit(time_jieba_start, "build", cache_dir).result()
+        stock_time = best_start("stock")
+        cached_time = best_start("cached", cache_dir)
+
+    print(f"  jieba自带缓存: {stock_time:.3f} 秒")
+    print(f"  建词典并保存缓存（第一次运行）: {build_time:.3f} 秒")
+    print(f"  读取词典缓存: {cached_time:.3f} 秒，提速 {stock_time / cached_time:.1f} 倍")
+
+def measure_imports(statement):
+    """
+    在新的解释器中用 -X importtime 执行导入语句，
+    返回 [(层级, 模块名, 自身耗时毫秒, 累计耗时毫秒)]，顺序与 Python 输出相同（子模块在前）
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=SCRIPT_DIR, capture_output=True, text=True, encoding='utf-8')
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(parts[0]) / 1000, int(parts[1]) / 1000))
+    return entries
+
+def import_children(entries, module):
+    """
+    module 直接导入的模块（下一层），按累计耗时从大到小排列
+    """
+    children = []
+    for depth, name, _, cumulative in entries:
+        if depth == 0:
+            if name == module:
+                return sorted(children, key=lambda item: item[1], reverse=True)
+            children = []
+        elif depth == 1:
+            children.append((name, cumulative))
+    return []
+
+def bench_imports():
+    """
+    导入耗时报告：每个脚本导入本身要多久、最慢的是哪些导入，
+    以及在启动时就导入全部较慢的库需要多久（脚本中这些库都在用到时才导入）
+    """
+    print("\n[导入耗时] python -X importtime")
+    for module in IMPORT_MODULES:
+        entries = measure_imports(f"import {module}")
+        total = next((cumulative for depth, name, _, cumulative in entries
+                      if depth == 0 and name == module), None)
+        if total is None:
+            print(f"  {module}: 导入失败")
+            continue
+        slowest = ", ".join(f"{name} {cumulative:.0f}" for name, cumulative
+                            in import_children(entries, module)[:IMPORT_TOP_N])
+        print(f"  {module:22s} {total:8.0f} 毫秒  最慢: {slowest}")
+
+    # 解释器启动本身也会导入一些模块（encodings、site 等），减去空语句的导入耗时
+    def top_level_total(statement):
+        return sum(cumulative for depth, _, _, cumulative in measure_imports(statement) if depth == 0)
+
+    heavy = top_level_total("; ".join(f"import {module}" for module in HEAVY_MODULES)) - top_level_total("pass")
+    print(f"  启动时全部导入 {', '.join(HEAVY_MODULES)}: {heavy:.0f} 毫秒")
+
+# ============================================
+# 第五部分：模拟聊天记录
+# ============================================
+
+COMMON_WORDS = [
+    "我们", "今天", "明天", "晚上", "时间", "工作", "项目", "开会", "吃饭", "周末",
+    "老师", "同学", "朋友", "公司", "领导", "文件", "资料", "问题", "方案", "需求",
+    "可以", "没有", "知道", "觉得", "需要", "已经", "还是", "现在", "一起", "看看",
+    "火锅", "奶茶", "电影", "游戏", "旅游", "天气", "下雨", "地铁", "快递", "外卖",
+    "哈哈哈", "好的", "收到", "谢谢", "辛苦", "厉害", "真的", "不错", "加油", "晚安",
+]
+EMOJIS = ["[微笑]", "[捂脸]", "[旺柴]", "[破涕为笑]", "[强]", "[呲牙]", "[偷笑]", "[OK]", "[抱拳]"]
+ENGLISH_WORDS = ["OK", "hello", "thanks", "meeting", "deadline", "lol", "bug", "release", "PPT", "offer"]
+URL_TEMPLATES = [
+    "https://mp.weixin.qq.com/s/{}",
+    "http://example.com/page?id={}",
+    "https://www.bilibili.com/video/BV{}",
+]
+SYSTEM_TEMPLATES = [
+    "\"{}\"撤回了一条消息",
+    "你已添加了{}，现在可以开始聊天了。",
+    "\"{}\"邀请\"{}\"加入了群聊",
+    "\"{}\"拍了拍我",
+]
+# 生成词汇用的常用汉字
+WORD_CHARS = ("的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下"
+              "过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两"
+              "体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内")
+
+def build_vocabulary(rng, size=SYNTHETIC_VOCABULARY):
+    """
+    生成模拟词汇表和齐普夫分布的累计权重（排名越靠前的词出现越多）
+    """
+    words = list(COMMON_WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = ''.join(rng.choices(WORD_CHARS, k=rng.choice((2, 2, 2, 3, 4))))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    cum_weights = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(words))))
+    return words, cum_weights
+
+def make_message_content(rng, words, cum_weights):
+    """
+    随机生成一条聊天内容：中文为主，混合英文、表情、链接、话题和公告
+    """
+    parts = rng.choices(words, cum_weights=cum_weights, k=rng.randint(1, 12))
+    if rng.random() < 0.5:
+        parts.insert(rng.randint(0, len(parts)), rng.choice("，。！？～"))
+    content = ''.join(parts)
+
+    kind = rng.random()
+    if kind < 0.10:
+        content += ' ' + ' '.join(rng.choices(ENGLISH_WORDS, k=rng.randint(1, 3)))
+    elif kind < 0.25:
+        content += ''.join(rng.choices(EMOJIS, k=rng.randint(1, 3)))
+    elif kind < 0.30:
+        content += ' ' + rng.choice(URL_TEMPLATES).format(rng.getrandbits(40))
+    elif kind < 0.33:
+        content = f"#{content}#"
+    elif kind < 0.35:
+        content = f"【通知】{content}"
+    elif kind < 0.38:
+        content += '\n' + ''.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(1, 6)))
+    elif kind < 0.42:
+        content = rng.choice(EMOJIS)
+    return content
+
+def write_synthetic_export(path, message_count, seed=RANDOM_SEED):
+    """
+    生成一个模拟的群聊导出文件（与真实导出相同的 session + messages 结构）
+    逐条写入，生成千万条消息时内存占用也很小
+    """
+    rng = random.Random(seed)
+    words, cum_weights = build_vocabulary(rng)
+    senders = [f"群友{i:03d}" for i in range(SYNTHETIC_SENDERS)]
+    timestamp = 1672531200  # 2023-01-01
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"session": ')
+        json.dump({
+            "wxid": "12345678@chatroom",
+            "nickname": f"模拟群聊{message_count}",
+            "type": "群聊",
+            "messageCount": message_count,
+        }, f, ensure_ascii=False)
+        f.write(', "messages": [\n')
+
+        lines = []
+        for i in range(message_count):
+            timestamp += rng.randint(1, 600)
+            sender = rng.choice(senders)
+            if rng.random() < SYSTEM_MESSAGE_RATIO:
+                template = rng.choice(SYSTEM_TEMPLATES)
+                msg_type = "系统消息"
+                content = template.format(*rng.sample(senders, template.count("{}")))
+                is_send = 0
+                sender = ""
+            else:
+                msg_type = "文本消息"
+                content = make_message_content(rng, words, cum_weights)
+                is_send = 1 if rng.random() < SELF_MESSAGE_RATIO else 0
+                if is_send:
+                    sender = "我"
+
+            lines.append(json.dumps({
+                "localId": i + 1,
+                "createTime": timestamp,
+                "formattedTime": time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(timestamp)),
+                "type": msg_type,
+                "content": content,
+                "isSend": is_send,
+                "senderDisplayName": sender,
+            }, ensure_ascii=False))
+
+            if len(lines) >= 10000:
+                f.write(',\n'.join(lines))
+                lines = []
+                if i + 1 < message_count:
+                    f.write(',\n')
+        if lines:
+            f.write(',\n'.join(lines))
+
+        f.write('\n], "lastTimestamp": %d}' % timestamp)
+
+def get_synthetic_export(message_count):
+    """
+    返回指定规模的模拟聊天记录路径，不存在时先生成
+    """
+    os.makedirs(BENCH_DATA_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DATA_DIR, f"synthetic_{message_count}_{RANDOM_SEED}.json")
+    if not os.path.exists(path):
+        print(f"  正在生成 {message_count} 条模拟消息: {path}")
+        start = time.perf_counter()
+        write_synthetic_export(path + ".tmp", message_count)
+        os.replace(path + ".tmp", path)
+        print(f"  生成完成 (耗时 {time.perf_counter() - start:.1f} 秒，"
+              f"{os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+    return path
+
+# ============================================
+# 第六部分：整条流程测试
+# ============================================
+
+def run_pipeline(pipeline, path, output_dir):
+    """
+    按脚本的设置跑一遍完整流程，返回各阶段的性能报告
+    在单独的进程中运行，内存峰值只包含这一次测试
+    """
+    if pipeline == "multi":
+        module = load_script("multi_chat_wordcloud.py")
+    else:
+        module = load_script("wechat_wordcloud2.0.py")
+
+    profiler = core.PipelineProfiler(pipeline, settings={"file": os.path.basename(path)})
+
+    # 脚本中的统计信息都输出到这里，不打印在屏幕上
+    with redirect_stdout(io.StringIO()):
+        with core.profile_stage(profiler, "jieba_init"):
+            core.init_jieba(core.get_dictionary_words(module.CUSTOM_WORDS, module.STOP_WORD_SET))
+
+        if pipeline == "stream":
+            # 读取到统计全部交替进行，只有一个 stream_count 阶段
+            stats = core.new_message_stats()
+            rows = core.iter_filtered_messages(
+                core.ChatFileStream(path), exclude_system=module.EXCLUDE_SYSTEM_MESSAGES, stats=stats)
+            view_counts = core.count_words_by_view(
+                rows, ["all"], module.REMOVE_REGEX, module.STOP_WORD_SET, profiler=profiler)
+        else:
+            # 流式读取和过滤是边读边做的
+            with core.profile_stage(profiler, "load_filter") as record:
+                messages, stats = core.filter_messages(
+                    core.ChatFileStream(path), who="all", exclude_system=module.EXCLUDE_SYSTEM_MESSAGES)
+                record["items"] = stats['total']
+        profiler.messages = stats['total']
+
+        if pipeline == "stream":
+            word_counts = view_counts["all"]
+            colormap = None
+        elif pipeline == "multi":
+            with core.profile_stage(profiler, "clean", len(messages)):
+                texts = module.extract_texts_from_messages(messages)
+            if module.DEDUP_MESSAGES:
+                word_counts = core.count_words_deduplicated(texts, module.STOP_WORD_SET, module.DEDUP_MESSAGES,
+                                                            profiler=profiler)
+            else:
+                word_counts = core.count_words(texts, module.STOP_WORD_SET, profiler=profiler)
+            colormap = module.COLOR_SCHEME
+        else:
+            view_counts = core.count_words_by_view(
+                messages, ["all"], module.REMOVE_REGEX, module.STOP_WORD_SET, profiler=profiler,
+                dedup=module.DEDUP_MESSAGES)
+            word_counts = view_counts["all"]
+            colormap = None
+
+        wordcloud = core.render_wordcloud(
+            word_counts,
+            font_path=None,
+            max_words=module.MAX_WORDS,
+            background_color=module.BACKGROUND_COLOR,
+            width=module.WIDTH,
+            height=module.HEIGHT,
+            font_size_range=module.FONT_SIZE_RANGE,
+            exponent=module.FREQUENCY_EXPONENT,
+            use_log_scale=module.USE_LOG_SCALE,
+            relative_scaling=module.RELATIVE_SCALING,
+            colormap=colormap,
+            profiler=profiler
+        )
+
+        with core.profile_stage(profiler, "save", len(word_counts)):
+            core.save_enhanced_results(wordcloud, word_counts,
+                                       os.path.join(output_dir, f"{pipeline}.png"),
+                                       os.path.join(output_dir, f"{pipeline}.csv"))
+
+    return profiler.build_report()
+
+def compare_with_baseline(key, report, baseline):
+    """
+    打印本次结果，有基准时同时打印基准耗时和变化
+    """
+    base_report = baseline.get("results", {}).get(key)
+    base_stages = {}
+    if base_report:
+        base_stages = {record["name"]: record for record in base_report["stages"]}
+
+    print(f"  {'阶段':14s} {'耗时(秒)':>10s} {'条/秒':>12s} {'内存峰值MB':>10s} {'基准(秒)':>10s} {'变化':>8s}")
+    for record in report["stages"]:
+        line = f"  {record['name']:16s} {record['seconds']:10.3f} "
+        line += f"{record['items_per_sec'] or 0:12,.0f} " if record['items_per_sec'] else f"{'-':>12s} "
+        line += f"{record['peak_rss_mb'] or 0:10.0f}"
+        base = base_stages.get(record["name"])
+        if base and base["seconds"] > 0:
+            change = record["seconds"] / base["seconds"] - 1
+            line += f" {base['seconds']:10.3f} {change:+8.1%}"
+        print(line)
+    print(f"  总计: {report['total_seconds']:.2f} 秒，{report['messages_per_sec']:,.0f} 条消息/秒，"
+          f"内存峰值 {report['peak_rss_mb'] or 0:.0f} MB")
+
+def load_baseline():
+    """
+    读取基准结果，没有或无法读取时返回空字典
+    """
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    try:
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"警告：无法读取基准文件 {BASELINE_FILE} - {e}")
+        return {}
+
+def save_results(path, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+def bench_pipeline():
+    """
+    对每种规模的模拟聊天记录跑完整流程，与基准对比并保存结果
+    """
+    baseline = load_baseline()
+    results = {
+        "created_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "sizes": PIPELINE_SIZES,
+        "results": {},
+    }
+
+    # spawn 方式启动子进程，内存峰值不受本进程影响
+    context = get_context("spawn")
+    with tempfile.TemporaryDirectory() as output_dir:
+        for size in PIPELINE_SIZES:
+            path = get_synthetic_export(size)
+            for pipeline in PIPELINES:
+                key = f"{pipeline}/{size}"
+                print(f"\n[整条流程] {key}")
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    report = executor.submit(run_pipeline, pipeline, path, output_dir).result()
+                results["results"][key] = report
+                compare_with_baseline(key, report, baseline)
+
+    if results["results"]:
+        results["environment"] = next(iter(results["results"].values()))["environment"]
+    save_results(RESULTS_FILE, results)
+    print(f"\n本次结果已保存: {RESULTS_FILE}")
+
+    if SAVE_BASELINE or not baseline:
+        save_results(BASELINE_FILE, results)
+        print(f"已保存为新的基准: {BASELINE_FILE}")
+
+# ============================================
+# 第七部分：主程序
+# ============================================
+
+def main():
+    print("=" * 60)
+    print("词云脚本性能测试")
+    print("=" * 60)
+
+    if RUN_CLEAN_BENCH:
+        print(f"测试消息数: {SAMPLE_SIZE}，每项重复 {REPEAT} 次")
+        texts = make_sample_texts(SAMPLE_SIZE)
+        bench_clean_text(texts)
+
+    if RUN_FILTER_BENCH:
+        bench_token_filter(make_sample_tokens(SAMPLE_SIZE // 10))
+
+    if RUN_IMPORT_BENCH:
+        bench_imports()
+
+    if RUN_STARTUP_BENCH:
+        bench_jieba_startup()
+
+    if RUN_PIPELINE_BENCH:
+        print(f"\n整条流程测试，消息规模: {', '.join(str(size) for size in PIPELINE_SIZES)}")
+        bench_pipeline()
+
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
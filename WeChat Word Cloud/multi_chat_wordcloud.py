@@ -4,15 +4,13 @@
 """
 
 import json
-import re
-import jieba
 import os
 from collections import Counter
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
 import glob
+import hashlib
+import time
+
+import wordcloud_core as core
 
 # ============================================
 # 第一部分：设置参数
@@ -27,6 +25,18 @@ JSON_FILES = []  # 如果为空，则自动查找文件夹下所有JSON文件
 # 2. 文件过滤设置
 FILE_PATTERN = "*.json"  # 文件匹配模式
 EXCLUDE_FILES = []  # 要排除的文件名列表
+# 同一个聊天导出了多次、文件之间有重叠时，跳过之前的文件中已有的消息（按发送者、时间和内容判断），
+# 重叠部分不会重复统计；每条消息只记录一个哈希值（增量统计时不使用）
+SKIP_DUPLICATE_MESSAGES = True
+STREAM_LOADING = True  # 是否流式读取JSON，逐条读取消息，内存占用与文件大小无关（适合几个GB的导出文件）
+STREAM_CHUNK_SIZE = 1024 * 1024  # 流式读取时每次读入的字符数
+# 不流式读取时，同时读取和解析多个文件（以下三项只在 STREAM_LOADING = False 时有效，流式读取总是逐个读取文件）
+LOAD_WORKERS = 4  # 同时读取的文件数，1=逐个读取
+LOAD_USE_PROCESSES = False  # False=线程池（适合I/O慢的磁盘），True=进程池（JSON解析也能并行，但结果需要在进程间传递）
+LOAD_MAX_INFLIGHT_MB = 1024  # 已开始读取但还没合并的文件总大小上限（MB），限制并发读取时的内存占用
+# 全程流式处理：读取、过滤、清洗、分词、统计逐条衔接，不保存消息和文本列表，
+# 内存占用只与词汇量有关，与聊天记录多少无关（总是流式读取，忽略 STREAM_LOADING）
+STREAM_PIPELINE = False
 
 # 3. 分析设置
 ANALYZE_WHO = "all"  # "all"=全部, "me"=自己, "other"=对方
@@ -44,12 +54,46 @@ USE_LOG_SCALE = True
 RELATIVE_SCALING = 0.8
 COLOR_SCHEME = "viridis"
 
-# 5. 输出设置
+# 5. 分词设置
+PARALLEL_WORKERS = 1  # 分词进程数，1=单进程分词，None=使用全部CPU核心
+PARALLEL_CHUNK_SIZE = 20000  # 并行分词时每个任务包含的文本条数
+TOKEN_CACHE_FILE = "token_cache.sqlite"  # 分词缓存文件，再次运行时已分过词的文本直接读缓存；None=不使用缓存
+TOKEN_CACHE_MAX_ENTRIES = 2000000  # 缓存最多保存的文本条数，超出后淘汰最久没用到的
+# 重复消息（转发刷屏、表情文字、机器人消息）的处理：None=逐条分词统计，
+# "count"=相同的文本只分词一次、词频乘以出现次数（结果不变，重复越多越快），"collapse"=重复的文本只计一次
+# 全程流式处理、按时间段/发送者统计和增量统计时不去重
+DEDUP_MESSAGES = "count"
+# 增量统计索引文件，如 "wordcount_index.json"；None=不使用
+# 每天重新导出的聊天记录只是在上次的基础上追加消息，设置后每个文件只处理上次之后新增的消息
+INCREMENTAL_INDEX_FILE = None
+
+# 6. 输出设置
 OUTPUT_IMAGE = "combined_wordcloud.png"
 OUTPUT_STATS = "combined_word_frequency.csv"
 OUTPUT_SUMMARY = "chat_summary.csv"  # 聊天记录汇总统计
+EXPORT_PARQUET = False  # 是否把每个词频统计再保存一份 Parquet 列式文件（同名 .parquet，需要安装 pyarrow），分析工具读取更快
+PROFILE_REPORT = True  # 是否保存各阶段耗时和内存占用报告（JSON，放在词频统计文件旁边，如 combined_word_frequency_profile.json）
+# 按时间段生成词云：只分词一次，同时得到全部消息和每个时间段的词频（增量统计时不支持）
+TIME_BUCKET = None  # None=不分时间段，"year"/"month"/"week"/"day"=每年/月/周/天一张词云
+TIME_BUCKET_DIR = "time_wordclouds"  # 时间段词云图片和词频统计的保存文件夹
+RENDER_WORKERS = 1  # 同时生成时间段词云和个人词云的进程数，1=逐张生成，None=使用全部CPU核心
+
+SENDER_CLOUDS = False  # 是否为群聊中每个发送者单独生成词云（与总词云在同一遍分词中统计）
+SENDER_DIR = "sender_wordclouds"  # 个人词云图片和词频统计的保存文件夹
+SENDER_MIN_MESSAGES = 50  # 消息数少于此值的发送者不生成词云（词频仍会写入CSV）
 
-# 6. 停用词
+# 词组词云：统计连续出现的二元、三元词组（如“项目上线”“明天早上”），与词频在同一遍分词中统计（增量统计时不支持）
+PHRASE_CLOUD = False
+PHRASE_MAX_N = 3  # 词组最多包含的词数，2=只统计二元词组
+PHRASE_MIN_COUNT = 5  # 出现次数少于此值的词组不输出
+# 点互信息（PMI）下限：越大越只保留固定搭配，排除两个常见词偶然相邻；None=不按PMI过滤
+PHRASE_MIN_PMI = 3.0
+PHRASE_SCORE = "count"  # 词组词云中词组的大小："count"=按出现次数，"pmi"=按点互信息
+PHRASE_MAX_ENTRIES = 2000000  # 统计中的词组数超过此值时删掉出现次数最少的，限制内存占用
+OUTPUT_PHRASE_IMAGE = "combined_phrase_wordcloud.png"
+OUTPUT_PHRASE_STATS = "combined_phrase_frequency.csv"
+
+# 7. 停用词
 STOP_WORDS = [
     "的", "了", "在", "是", "我", "有", "和", "就", 
     "不", "人", "都", "一", "一个", "上", "也", "很", 
@@ -61,8 +105,10 @@ STOP_WORDS = [
     "所以", "但是", "然后", "而且", "其实", "还是",
     "就是", "就是", "就是", "就是", "就是", "就是"
 ]
+STOP_WORDS_FILES = []  # 停用词文件（每行一个词，# 开头为注释），如 ["stopwords.txt"]
+CUSTOM_WORDS = []  # 自定义词语（人名、昵称、群里的常用语等），分词时保持完整；分词词典建好后会缓存，以后启动更快
 
-# 7. 排除模式
+# 8. 排除模式
 REMOVE_PATTERNS = [
     r'http[s]?://\S+',
     r'\[.*?\]',
@@ -104,100 +150,190 @@ def get_json_files(folder_path, file_pattern="*.json", exclude_files=None):
     filtered_files = [f for f in all_files 
                      if os.path.basename(f) not in exclude_files]
     
-    # 按文件大小排序（从大到小）
-    filtered_files.sort(key=lambda x: os.path.getsize(x), reverse=True)
+    # 按文件大小排序（从大到小），每个文件只取一次大小
+    sizes = {f: os.path.getsize(f) for f in filtered_files}
+    filtered_files.sort(key=sizes.get, reverse=True)
     
     return filtered_files
 
+def build_chat_info(filename, session, message_count):
+    """
+    根据 session 字段生成聊天信息
+    """
+    chat_info = {
+        'filename': filename,
+        'message_count': message_count,
+        'chat_name': '未知聊天',
+        'last_time': '未知',
+        'type': '未知'
+    }
+    
+    if session is not None:
+        chat_info['chat_name'] = session.get('nickname', 
+                                           session.get('remark', 
+                                                     session.get('displayName', '未知聊天')))
+        chat_info['last_time'] = session.get('lastTimestamp', '未知')
+        chat_info['type'] = session.get('type', '未知')
+        chat_info['message_count'] = session.get('messageCount', message_count)
+    
+    print(f"  ✓ 已加载: {filename}")
+    print(f"    聊天对象: {chat_info['chat_name']}")
+    print(f"    消息数量: {chat_info['message_count']}")
+    
+    return chat_info
+
+def report_loaded_file(file_path, result):
+    """
+    输出单个文件的加载结果
+    result 为 core.read_chat_file 的返回值，或读取时抛出的异常
+    返回 (消息列表, 聊天信息)，文件无效时返回 (None, None)
+    """
+    filename = os.path.basename(file_path)
+    
+    if isinstance(result, json.JSONDecodeError):
+        print(f"错误：{file_path} 不是有效的JSON文件 - {result}")
+        return None, None
+    if isinstance(result, Exception):
+        print(f"读取 {file_path} 时出错: {result}")
+        return None, None
+    
+    messages, session, elapsed = result
+    
+    # 检查数据结构
+    if messages is None:
+        print(f"警告：{filename} 中没有找到'messages'字段，跳过此文件")
+        return None, None
+    if not isinstance(messages, list):
+        print(f"警告：{filename} 中的'messages'字段不是消息列表，跳过此文件")
+        return None, None
+    
+    # 获取聊天信息
+    chat_info = build_chat_info(filename, session, len(messages))
+    print(f"    读取耗时: {elapsed:.2f} 秒")
+    
+    return messages, chat_info
+
 def load_single_chat_file(file_path):
     """
     加载单个聊天记录文件
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
+        result = core.read_chat_file(file_path)
+    except Exception as e:
+        result = e
+    
+    return report_loaded_file(file_path, result)
+
+def stream_all_chat_files(json_files, chat_infos):
+    """
+    流式加载所有聊天记录文件，逐条产出消息
+    每个文件读完后，其聊天信息追加到 chat_infos 中
+    """
+    skipped_files = []
+    identities = core.MessageIdentitySet() if SKIP_DUPLICATE_MESSAGES and len(json_files) > 1 else None
+    
+    for file_path in json_files:
         filename = os.path.basename(file_path)
+        stream = core.ChatFileStream(file_path, STREAM_CHUNK_SIZE)
+        skipped_before = identities.skipped if identities is not None else 0
         
-        # 检查数据结构
-        if 'messages' not in data:
-            print(f"警告：{filename} 中没有找到'messages'字段，跳过此文件")
-            return None, filename
-        
-        messages = data['messages']
-        
-        # 获取聊天信息
-        chat_info = {
-            'filename': filename,
-            'message_count': len(messages),
-            'chat_name': '未知聊天',
-            'last_time': '未知',
-            'type': '未知'
-        }
-        
-        if 'session' in data:
-            session = data['session']
-            chat_info['chat_name'] = session.get('nickname', 
-                                               session.get('remark', 
-                                                         session.get('displayName', '未知聊天')))
-            chat_info['last_time'] = session.get('lastTimestamp', '未知')
-            chat_info['type'] = session.get('type', '未知')
-            chat_info['message_count'] = session.get('messageCount', len(messages))
-        
-        print(f"  ✓ 已加载: {filename}")
-        print(f"    聊天对象: {chat_info['chat_name']}")
-        print(f"    消息数量: {chat_info['message_count']}")
+        try:
+            yield from (identities.iter_new(stream) if identities is not None else stream)
+        except json.JSONDecodeError as e:
+            print(f"错误：{file_path} 不是有效的JSON文件 - {e}")
+            if stream.message_count:
+                print(f"    已读取的 {stream.message_count} 条消息仍会被统计")
+            skipped_files.append(filename)
+            continue
+        except Exception as e:
+            print(f"读取 {file_path} 时出错: {e}")
+            skipped_files.append(filename)
+            continue
         
-        return messages, chat_info
+        if not stream.has_messages:
+            print(f"警告：{filename} 中没有找到'messages'字段，跳过此文件")
+            skipped_files.append(filename)
+            continue
         
-    except json.JSONDecodeError as e:
-        print(f"错误：{file_path} 不是有效的JSON文件 - {e}")
-        return None, None
-    except Exception as e:
-        print(f"读取 {file_path} 时出错: {e}")
-        return None, None
+        chat_infos.append(build_chat_info(filename, stream.meta.get('session'), stream.message_count))
+        if identities is not None and identities.skipped > skipped_before:
+            print(f"    与之前的文件重复的消息: {identities.skipped - skipped_before} 条，已跳过")
+    
+    print(f"\n文件加载完成:")
+    print(f"  ✓ 成功加载: {len(chat_infos)} 个文件")
+    print(f"  ✗ 跳过文件: {len(skipped_files)} 个")
+    if skipped_files:
+        print(f"    跳过的文件: {', '.join(skipped_files)}")
+    if identities is not None:
+        print(f"  ↺ 跳过重复消息: {identities.skipped} 条")
 
-def load_all_chat_files():
+def scan_chat_files():
     """
-    加载所有聊天记录文件
+    扫描并列出所有要处理的JSON文件
     """
     print("正在扫描JSON文件...")
     
-    # 获取所有JSON文件
-    json_files = get_json_files(JSON_FOLDER, FILE_PATTERN, EXCLUDE_FILES)
+    # 获取所有JSON文件（跳过本程序和2.0脚本生成的性能报告，以及增量索引）
+    exclude_files = list(EXCLUDE_FILES) + [os.path.basename(core.get_profile_path(OUTPUT_STATS))]
+    exclude_files += [os.path.basename(path) for path in glob.glob(os.path.join(JSON_FOLDER, "*_profile.json"))]
+    if INCREMENTAL_INDEX_FILE:
+        exclude_files.append(os.path.basename(INCREMENTAL_INDEX_FILE))
+    json_files = get_json_files(JSON_FOLDER, FILE_PATTERN, exclude_files)
     
     if not json_files:
         print(f"错误：在 '{JSON_FOLDER}' 文件夹中没有找到JSON文件！")
         print("请检查：")
         print(f"1. JSON文件是否在 '{JSON_FOLDER}' 文件夹中")
         print(f"2. 文件扩展名是否为 .json")
-        return [], []
+        return []
     
     print(f"找到 {len(json_files)} 个JSON文件:")
     for i, file in enumerate(json_files, 1):
         size_mb = os.path.getsize(file) / (1024 * 1024)
         print(f"  {i:2d}. {os.path.basename(file)} ({size_mb:.1f} MB)")
     
-    print("\n开始加载文件...")
-    
+    return json_files
+
+def load_all_chat_files(json_files):
+    """
+    加载所有聊天记录文件
+    """
     all_messages = []
     chat_infos = []
     skipped_files = []
     
-    for file_path in json_files:
-        messages, chat_info = load_single_chat_file(file_path)
-        
+    start = time.perf_counter()
+    if LOAD_WORKERS > 1 and len(json_files) > 1:
+        mode = "进程" if LOAD_USE_PROCESSES else "线程"
+        print(f"\n开始并发加载文件 ({LOAD_WORKERS} 个{mode})...")
+        loaded = (report_loaded_file(file_path, result)
+                  for file_path, result in core.iter_chat_files_concurrently(
+                      json_files, LOAD_WORKERS, LOAD_USE_PROCESSES, LOAD_MAX_INFLIGHT_MB))
+    else:
+        print("\n开始加载文件...")
+        loaded = (load_single_chat_file(file_path) for file_path in json_files)
+    
+    identities = core.MessageIdentitySet() if SKIP_DUPLICATE_MESSAGES and len(json_files) > 1 else None
+    for file_path, (messages, chat_info) in zip(json_files, loaded):
         if messages is not None and chat_info is not None:
-            all_messages.extend(messages)
+            if identities is not None:
+                skipped_before = identities.skipped
+                all_messages.extend(identities.iter_new(messages))
+                if identities.skipped > skipped_before:
+                    print(f"    与之前的文件重复的消息: {identities.skipped - skipped_before} 条，已跳过")
+            else:
+                all_messages.extend(messages)
             chat_infos.append(chat_info)
         else:
             skipped_files.append(os.path.basename(file_path))
     
-    print(f"\n文件加载完成:")
+    print(f"\n文件加载完成 (耗时 {time.perf_counter() - start:.2f} 秒):")
     print(f"  ✓ 成功加载: {len(chat_infos)} 个文件")
     print(f"  ✗ 跳过文件: {len(skipped_files)} 个")
     if skipped_files:
         print(f"    跳过的文件: {', '.join(skipped_files)}")
+    if identities is not None:
+        print(f"  ↺ 跳过重复消息: {identities.skipped} 条")
     
     return all_messages, chat_infos
 
@@ -205,166 +341,273 @@ def load_all_chat_files():
 # 第三部分：数据处理函数
 # ============================================
 
-def filter_messages(messages, who="all", exclude_system=True):
-    """
-    过滤消息
-    """
-    filtered = []
-    stats = {
-        'total': len(messages),
-        'text': 0,
-        'system': 0,
-        'me': 0,
-        'other': 0,
-        'other_names': set()
-    }
-    
-    for msg in messages:
-        msg_type = msg.get('type', '')
-        content = msg.get('content', '')
-        
-        if not content or not isinstance(content, str):
-            continue
-        
-        # 统计系统消息
-        if msg_type == "系统消息":
-            stats['system'] += 1
-            if exclude_system:
-                continue
-        else:
-            stats['text'] += 1
-        
-        # 获取发送者信息
-        is_send = msg.get('isSend')
-        sender_name = msg.get('senderDisplayName', '')
-        
-        # 统计发送者
-        if is_send == 1:
-            stats['me'] += 1
-        elif is_send == 0 and sender_name:
-            stats['other'] += 1
-            stats['other_names'].add(sender_name)
-        
-        # 根据发送者过滤
-        if who == "me" and is_send != 1:
-            continue
-        elif who == "other" and is_send != 0:
-            continue
-        elif who not in ["all", "me", "other"]:
-            continue
-        
-        # 添加消息
-        filtered.append({
-            'content': content,
-            'type': msg_type,
-            'sender': sender_name,
-            'isSend': is_send,
-            'time': msg.get('formattedTime', '')
-        })
-    
-    print(f"\n消息统计:")
-    print(f"  总消息数: {stats['total']}")
-    print(f"  文本消息: {stats['text']}")
-    print(f"  系统消息: {stats['system']}")
-    print(f"  我发送的: {stats['me']}")
-    print(f"  对方发送: {stats['other']}")
-    if stats['other_names']:
-        print(f"  聊天对象: {', '.join(stats['other_names'])}")
-    
-    print(f"过滤后得到 {len(filtered)} 条有效消息")
-    return filtered, stats
+# 启动时编译一次，避免每条消息都重新查找正则缓存
+REMOVE_REGEX = core.compile_remove_patterns(REMOVE_PATTERNS)
+
+# 停用词和停用词文件合并成一个 frozenset，查找只需一次哈希
+STOP_WORD_SET = core.build_stop_words(STOP_WORDS, STOP_WORDS_FILES)
 
 def clean_text(text, remove_patterns=None):
     """
     清洗文本
     """
     if remove_patterns is None:
-        remove_patterns = REMOVE_PATTERNS
-    
-    if not isinstance(text, str):
-        return ""
-    
-    cleaned = text
-    for pattern in remove_patterns:
-        cleaned = re.sub(pattern, '', cleaned)
-    
-    # 移除多余空白字符
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+        remove_regex = REMOVE_REGEX
+    else:
+        remove_regex = core.compile_remove_patterns(remove_patterns)
     
-    return cleaned
+    return core.clean_text(text, remove_regex)
 
-def extract_texts_from_messages(messages, include_names=False, names=None):
+def get_other_names(messages):
     """
-    从消息中提取文本
+    过滤后的消息（core.MessageColumns）中所有聊天对象的名字
     """
-    texts = []
-    word_count = 0
+    return {sender for sender, is_send in zip(messages.senders, messages.is_send)
+            if is_send == 0 and sender}
+
+def iter_texts_from_messages(rows, include_names=False, names=None, progress=None):
+    """
+    逐条清洗消息并产出文本
+    rows: (内容, 类型, 发送者, isSend, 时间) 元组的迭代器
+    progress: 字典，累加已产出的文本数（texts）和字符数（chars）
+    """
+    if progress is None:
+        progress = {}
+    progress.setdefault('texts', 0)
+    progress.setdefault('chars', 0)
     
-    for msg in messages:
-        content = msg.get('content', '')
+    for content, _, sender, _, _ in rows:
         if not content:
             continue
         
         cleaned = clean_text(content)
         if cleaned:
-            texts.append(cleaned)
-            word_count += len(cleaned)
+            progress['texts'] += 1
+            progress['chars'] += len(cleaned)
+            yield cleaned
             
             # 如果需要，添加聊天对象名字到文本中
             if include_names and names:
-                sender = msg.get('sender', '')
                 if sender in names:
                     # 将名字按单个字拆分，避免jieba分词识别
                     for char in sender:
-                        if char not in STOP_WORDS and len(char) > 0:
-                            texts.append(char)
+                        if char not in STOP_WORD_SET and len(char) > 0:
+                            progress['texts'] += 1
+                            yield char
+
+def extract_texts_from_messages(messages, include_names=False, names=None):
+    """
+    从消息（core.MessageColumns）中提取文本
+    """
+    progress = {}
+    texts = list(iter_texts_from_messages(messages.rows(), include_names, names, progress))
     
-    print(f"提取到 {len(texts)} 条文本，共约 {word_count} 个字符")
+    print(f"提取到 {progress['texts']} 条文本，共约 {progress['chars']} 个字符")
     return texts
 
-# ============================================
-# 第四部分：词云生成函数
-# ============================================
+# 增量索引的格式版本，格式变化时旧索引作废
+INCREMENTAL_INDEX_VERSION = 1
 
-def enhance_frequency_distribution(word_counts, exponent=1.5, use_log_scale=True):
+class CheckpointMismatch(Exception):
+    """文件不是上次导出的追加版本，检查点失效"""
+
+def incremental_settings_key():
     """
-    增强词频分布
+    影响词频结果的设置，任何一项变化后增量索引都需要重建
+    分词词典的标识包括 jieba 版本、词典文件和自定义词语（需在 init_jieba 之后调用）
     """
-    if not word_counts:
-        return {}
+    settings = [ANALYZE_WHO, EXCLUDE_SYSTEM_MESSAGES, INCLUDE_NAMES_IN_WORDS,
+                REMOVE_PATTERNS, sorted(STOP_WORD_SET), core.get_jieba_dictionary_key()]
+    return hashlib.md5(json.dumps(settings, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def message_fingerprint(msg):
+    """
+    消息内容的指纹，用来确认新导出的文件是否以上次的消息为前缀
+    """
+    data = json.dumps(msg, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def load_incremental_index(index_path):
+    """
+    读取增量索引，不存在或设置已改变时返回空索引
+    """
+    empty = {
+        'version': INCREMENTAL_INDEX_VERSION,
+        'settings': incremental_settings_key(),
+        'files': {}
+    }
     
-    enhanced_counts = {}
+    if not os.path.exists(index_path):
+        return empty
     
-    frequencies = list(word_counts.values())
-    if len(frequencies) < 2:
-        return word_counts
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"警告：增量索引 {index_path} 无法读取 - {e}，将重新统计")
+        return empty
     
-    min_freq = min(frequencies)
-    max_freq = max(frequencies)
+    if index.get('version') != empty['version'] or index.get('settings') != empty['settings']:
+        print("分析设置已改变，增量索引将重新统计")
+        return empty
     
-    for word, freq in word_counts.items():
-        if use_log_scale:
-            enhanced = math.log(freq + 1) ** exponent
-        else:
-            enhanced = freq ** exponent
-        enhanced_counts[word] = enhanced
-    
-    # 缩放到1-100范围
-    enhanced_values = list(enhanced_counts.values())
-    min_enhanced = min(enhanced_values)
-    max_enhanced = max(enhanced_values)
-    
-    scaled_counts = {}
-    for word, enhanced in enhanced_counts.items():
-        if max_enhanced > min_enhanced:
-            scaled = 1 + 99 * (enhanced - min_enhanced) / (max_enhanced - min_enhanced)
-        else:
-            scaled = 50
-        scaled_counts[word] = scaled
+    return index
+
+def save_incremental_index(index, index_path):
+    """
+    保存增量索引（先写临时文件再替换，避免中途出错损坏索引）
+    """
+    temp_path = index_path + '.tmp'
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(temp_path, index_path)
+        print(f"增量索引已保存: {index_path}")
+    except OSError as e:
+        print(f"保存增量索引失败: {e}")
+
+def iter_messages_after(stream, checkpoint, progress):
+    """
+    跳过检查点之前的消息，只产出新增的消息
+    读完后把最后一条消息的指纹和时间写入 progress
+    """
+    skip = checkpoint['message_index'] if checkpoint else 0
+    last_msg = None
+    
+    for i, msg in enumerate(stream):
+        last_msg = msg
+        if i < skip - 1:
+            continue
+        if i == skip - 1:
+            # 检查点处的消息必须与上次相同，否则说明文件不是追加导出的
+            if message_fingerprint(msg) != checkpoint['last_fingerprint']:
+                raise CheckpointMismatch()
+            continue
+        yield msg
+    
+    if stream.message_count < skip:
+        raise CheckpointMismatch()
+    
+    if last_msg is not None:
+        progress['last_fingerprint'] = message_fingerprint(last_msg)
+        progress['last_time'] = last_msg.get('formattedTime', '')
+
+def merge_stats(total_stats, stats):
+    """
+    把 stats 中的消息统计累加到 total_stats
+    """
+    for key in ('total', 'text', 'system', 'me', 'other'):
+        total_stats[key] = total_stats.get(key, 0) + stats.get(key, 0)
+    total_stats['other_names'] = set(total_stats.get('other_names', ())) | set(stats.get('other_names', ()))
+    return total_stats
+
+def update_file_checkpoint(file_path, checkpoint):
+    """
+    只读取、过滤和分词检查点之后的新消息，与检查点中已有的词频合并
+    返回 (新的检查点, 新增有效消息数)；文件中没有消息时返回 (None, 0)
+    """
+    filename = os.path.basename(file_path)
+    stream = core.ChatFileStream(file_path, STREAM_CHUNK_SIZE)
+    progress = {}
+    
+    if checkpoint:
+        print(f"\n{filename}: 跳过已统计的 {checkpoint['message_index']} 条消息")
+    
+    try:
+        filtered, stats = core.filter_messages(
+            iter_messages_after(stream, checkpoint, progress),
+            who=ANALYZE_WHO,
+            exclude_system=EXCLUDE_SYSTEM_MESSAGES
+        )
+    except CheckpointMismatch:
+        print(f"{filename} 与上次的导出内容不一致，重新统计整个文件")
+        return update_file_checkpoint(file_path, None)
+    
+    if not stream.has_messages:
+        print(f"警告：{filename} 中没有找到'messages'字段，跳过此文件")
+        return None, 0
+    
+    word_counts = Counter(checkpoint['counts']) if checkpoint else Counter()
+    
+    if filtered:
+        texts = extract_texts_from_messages(
+            filtered,
+            include_names=INCLUDE_NAMES_IN_WORDS,
+            names=get_other_names(filtered)
+        )
+        if texts:
+            word_counts.update(count_texts(texts))
+    
+    old_stats = checkpoint['stats'] if checkpoint else {}
+    merged_stats = merge_stats(merge_stats({}, old_stats), stats)
+    merged_stats['other_names'] = sorted(merged_stats['other_names'])
+    
+    new_checkpoint = {
+        'message_index': stream.message_count,
+        'last_fingerprint': progress.get('last_fingerprint', ''),
+        'last_time': progress.get('last_time', ''),
+        'valid_count': (checkpoint['valid_count'] if checkpoint else 0) + len(filtered),
+        'chat_info': build_chat_info(filename, stream.meta.get('session'), stream.message_count),
+        'stats': merged_stats,
+        'counts': dict(word_counts),
+    }
+    return new_checkpoint, len(filtered)
+
+def update_incremental_index(json_files, index_path):
+    """
+    增量统计：每个文件只处理检查点之后的新消息，合并出所有文件的总词频
+    返回 (词频, 聊天信息列表, 消息统计, 有效消息数)
+    """
+    index = load_incremental_index(index_path)
+    checkpoints = index['files']
+    
+    word_counts = Counter()
+    chat_infos = []
+    stats = {}
+    valid_count = 0
+    new_count = 0
+    skipped_files = []
+    
+    for file_path in json_files:
+        filename = os.path.basename(file_path)
+        try:
+            checkpoint, file_new_count = update_file_checkpoint(file_path, checkpoints.get(filename))
+        except json.JSONDecodeError as e:
+            print(f"错误：{file_path} 不是有效的JSON文件 - {e}")
+            skipped_files.append(filename)
+            continue
+        except Exception as e:
+            print(f"读取 {file_path} 时出错: {e}")
+            skipped_files.append(filename)
+            continue
+        
+        if checkpoint is None:
+            skipped_files.append(filename)
+            continue
+        
+        checkpoints[filename] = checkpoint
+        word_counts.update(checkpoint['counts'])
+        chat_infos.append(checkpoint['chat_info'])
+        merge_stats(stats, checkpoint['stats'])
+        valid_count += checkpoint['valid_count']
+        new_count += file_new_count
+    
+    save_incremental_index(index, index_path)
+    
+    print(f"\n增量统计完成:")
+    print(f"  ✓ 统计文件: {len(chat_infos)} 个")
+    print(f"  ✗ 跳过文件: {len(skipped_files)} 个")
+    if skipped_files:
+        print(f"    跳过的文件: {', '.join(skipped_files)}")
+    print(f"  新增有效消息: {new_count} 条，累计有效消息: {valid_count} 条")
     
-    return scaled_counts
+    return word_counts, chat_infos, stats, valid_count
 
-def generate_combined_wordcloud(texts, chat_infos=None):
+# ============================================
+# 第四部分：词云生成函数
+# ============================================
+
+def generate_combined_wordcloud(texts, chat_infos=None, profiler=None, ngrams=None):
     """
     生成综合词云
     """
@@ -373,86 +616,135 @@ def generate_combined_wordcloud(texts, chat_infos=None):
         return None, None
     
     print(f"\n正在处理 {len(texts)} 条文本...")
+    word_counts = count_texts(texts, profiler, ngrams)
     
-    # 合并所有文本
-    all_text = ' '.join(texts)
-    
-    # 使用jieba分词
-    print("正在分词...")
-    words = jieba.lcut(all_text)
-    
-    # 过滤停用词和单字
-    filtered_words = []
-    for word in words:
-        word = word.strip()
-        if (len(word) > 1 and
-            word not in STOP_WORDS and
-            not word.isdigit() and
-            not re.match(r'^[^\u4e00-\u9fa5]+$', word)):
-            filtered_words.append(word)
+    return build_combined_wordcloud(word_counts, profiler)
+
+def count_texts(texts, profiler=None, ngrams=None):
+    """
+    使用jieba分词，过滤停用词和单字并统计词频
+    根据设置选择去重、分词缓存、多进程或单进程分词
+    ngrams: core.NgramCounter，不为 None 时同时统计词组
+    """
+    if DEDUP_MESSAGES:
+        # 去重后分词缓存和多进程分词同样有效，各阶段分别记录
+        print(f"正在去重并分词 ({core.DEDUP_MODES[DEDUP_MESSAGES]})...")
+        return core.count_words_deduplicated(
+            texts, STOP_WORD_SET, DEDUP_MESSAGES,
+            cache_path=TOKEN_CACHE_FILE,
+            workers=PARALLEL_WORKERS,
+            batch_size=PARALLEL_CHUNK_SIZE,
+            cache_max_entries=TOKEN_CACHE_MAX_ENTRIES,
+            profiler=profiler,
+            ngrams=ngrams
+        )
     
-    # 统计词频
-    word_counts = Counter(filtered_words)
+    # 使用缓存或多进程时分词和统计是交替进行的，合并记录为一个阶段
+    if TOKEN_CACHE_FILE:
+        print("正在分词 (使用分词缓存)...")
+        with core.profile_stage(profiler, "segment_count", len(texts)):
+            return core.count_words_cached(
+                texts, STOP_WORD_SET, TOKEN_CACHE_FILE,
+                workers=PARALLEL_WORKERS,
+                batch_size=PARALLEL_CHUNK_SIZE,
+                cache_max_entries=TOKEN_CACHE_MAX_ENTRIES,
+                ngrams=ngrams
+            )
+    
+    if PARALLEL_WORKERS != 1 and len(texts) > PARALLEL_CHUNK_SIZE:
+        print(f"正在并行分词 (进程数: {PARALLEL_WORKERS or os.cpu_count()})...")
+        with core.profile_stage(profiler, "segment_count", len(texts)):
+            if ngrams is not None:
+                # 统计词组需要每条文本的分词结果，不能只合并各进程的词频
+                return core.count_words_cached(texts, STOP_WORD_SET, None, workers=PARALLEL_WORKERS,
+                                               batch_size=PARALLEL_CHUNK_SIZE, ngrams=ngrams)
+            return core.count_words_parallel(texts, STOP_WORD_SET, workers=PARALLEL_WORKERS,
+                                             chunk_size=PARALLEL_CHUNK_SIZE)
     
+    print("正在分词...")
+    return core.count_words(texts, STOP_WORD_SET, profiler=profiler, ngrams=ngrams)
+
+def count_texts_streaming(texts, ngrams=None):
+    """
+    边读边分词统计，texts 为迭代器，每次只保留一批文本
+    """
+    print(f"正在流式分词 (每批 {PARALLEL_CHUNK_SIZE} 条)...")
+    if DEDUP_MESSAGES == "collapse":
+        print("提示：流式统计时不去重，忽略 DEDUP_MESSAGES 设置")
+    return core.count_words_cached(
+        texts, STOP_WORD_SET, TOKEN_CACHE_FILE,
+        workers=PARALLEL_WORKERS,
+        batch_size=PARALLEL_CHUNK_SIZE,
+        cache_max_entries=TOKEN_CACHE_MAX_ENTRIES,
+        ngrams=ngrams
+    )
+
+def get_render_options(font_path):
+    """
+    生成词云的参数（core.render_wordcloud 除词频以外的参数）
+    """
+    return {
+        'font_path': font_path,
+        'max_words': MAX_WORDS,
+        'background_color': BACKGROUND_COLOR,
+        'width': WIDTH,
+        'height': HEIGHT,
+        'font_size_range': FONT_SIZE_RANGE,
+        'exponent': FREQUENCY_EXPONENT,
+        'use_log_scale': USE_LOG_SCALE,
+        'relative_scaling': RELATIVE_SCALING,
+        'colormap': COLOR_SCHEME,
+    }
+
+def count_by_group(messages, profiler=None, ngrams=None):
+    """
+    按时间段和/或发送者统计词频，同时得到全部消息的词频（只清洗和分词一次）
+    messages: 过滤后的 core.MessageColumns，或 core.iter_filtered_messages 的迭代器
+    返回 (全部词频, {时间段: 词频} 或 None, core.SenderWordMatrix 或 None)
+    """
+    groups = []
+    if TIME_BUCKET:
+        groups.append(f"每{core.TIME_BUCKET_NAMES[TIME_BUCKET]}")
+    if SENDER_CLOUDS:
+        groups.append("每个发送者")
+    print(f"\n正在按{'和'.join(groups)}统计词频...")
+    if DEDUP_MESSAGES == "collapse":
+        print("提示：按时间段和发送者统计时不去重，忽略 DEDUP_MESSAGES 设置")
+    return core.count_words_by_group(
+        messages, REMOVE_REGEX, STOP_WORD_SET,
+        period=TIME_BUCKET,
+        by_sender=SENDER_CLOUDS,
+        cache_path=TOKEN_CACHE_FILE,
+        workers=PARALLEL_WORKERS,
+        batch_size=PARALLEL_CHUNK_SIZE,
+        cache_max_entries=TOKEN_CACHE_MAX_ENTRIES,
+        profiler=profiler,
+        ngrams=ngrams
+    )
+
+def build_combined_wordcloud(word_counts, profiler=None):
+    """
+    根据词频生成综合词云
+    """
     if not word_counts:
         print("错误：分词后没有有效的词语")
         return None, None
     
-    print(f"分词得到 {len(filtered_words)} 个有效词语，{len(word_counts)} 个不同词语")
+    print(f"分词得到 {sum(word_counts.values())} 个有效词语，{len(word_counts)} 个不同词语")
     
     # 显示最常见的30个词
     print("\n最常见的30个词语:")
     for i, (word, count) in enumerate(word_counts.most_common(30), 1):
         print(f"  {i:2d}. {word:10s}: {count:6d}次")
     
-    # 增强词频分布
-    print(f"\n应用增强参数: 指数={FREQUENCY_EXPONENT}, 对数缩放={USE_LOG_SCALE}")
-    enhanced_counts = enhance_frequency_distribution(
-        word_counts, 
-        exponent=FREQUENCY_EXPONENT,
-        use_log_scale=USE_LOG_SCALE
-    )
-    
     # 查找字体
-    font_path = None
-    possible_fonts = [
-        "C:/Windows/Fonts/simhei.ttf",
-        "C:/Windows/Fonts/msyh.ttc",
-        "C:/Windows/Fonts/simsun.ttc",
-        "simhei.ttf",
-    ]
-    
-    for font in possible_fonts:
-        if os.path.exists(font):
-            font_path = font
-            print(f"使用字体: {font}")
-            break
-    
-    if not font_path:
-        print("警告：未找到中文字体，使用默认字体")
-    
-    # 创建词云对象
-    print("正在生成词云...")
-    wc = WordCloud(
-        font_path=font_path,
-        width=WIDTH,
-        height=HEIGHT,
-        background_color=BACKGROUND_COLOR,
-        max_words=MAX_WORDS,
-        max_font_size=FONT_SIZE_RANGE[1],
-        min_font_size=FONT_SIZE_RANGE[0],
-        relative_scaling=RELATIVE_SCALING,
-        random_state=42,
-        collocations=False,
-        colormap=COLOR_SCHEME,
-        prefer_horizontal=0.9,
-        scale=2,
-        contour_width=0,
-        contour_color='steelblue',
-    )
+    font_path = core.find_chinese_font()
     
-    # 生成词云
-    wc.generate_from_frequencies(enhanced_counts)
+    # 增强词频分布并生成词云
+    # 词云最多只画 MAX_WORDS 个词，先用堆选出这些词，增强和布局的耗时只与 MAX_WORDS 有关
+    print(f"\n应用增强参数: 指数={FREQUENCY_EXPONENT}, 对数缩放={USE_LOG_SCALE}")
+    print("正在生成词云...")
+    wc = core.render_wordcloud(word_counts, profiler=profiler, **get_render_options(font_path))
     
     print(f"词云生成完成，包含 {len(wc.words_)} 个词语")
     
@@ -477,26 +769,21 @@ def save_combined_results(wordcloud, word_counts, chat_infos, stats):
         print(f"保存图片失败: {e}")
         return False
     
-    # 保存词频统计
+    # 保存词频统计（排序只做一次，直接从排好序的列表写文件和显示）
     try:
-        df_word_freq = pd.DataFrame(
-            word_counts.most_common(),
-            columns=['词语', '频次']
-        )
-        df_word_freq.to_csv(OUTPUT_STATS, index=False, encoding='utf-8-sig')
+        sorted_counts = word_counts.most_common()
+        core.save_frequency_table(sorted_counts, ['词语', '频次'], OUTPUT_STATS, EXPORT_PARQUET)
         print(f"词频统计已保存: {OUTPUT_STATS}")
         
         # 显示前20个词
         print("\n词频前20名:")
-        for i, row in df_word_freq.head(20).iterrows():
-            print(f"  {i+1:2d}. {row['词语']:10s}: {row['频次']:6d}次")
+        for i, (word, freq) in enumerate(sorted_counts[:20]):
+            print(f"  {i+1:2d}. {word:10s}: {freq:6d}次")
         
         # 统计信息
-        if len(df_word_freq) >= 2:
-            max_word = df_word_freq.iloc[0]['词语']
-            max_freq = df_word_freq.iloc[0]['频次']
-            min_word = df_word_freq.iloc[-1]['词语']
-            min_freq = df_word_freq.iloc[-1]['频次']
+        if len(sorted_counts) >= 2:
+            max_word, max_freq = sorted_counts[0]
+            min_word, min_freq = sorted_counts[-1]
             ratio = max_freq / min_freq if min_freq > 0 else 0
             
             print(f"\n词频差异统计:")
@@ -510,9 +797,9 @@ def save_combined_results(wordcloud, word_counts, chat_infos, stats):
     # 保存聊天记录汇总
     try:
         if chat_infos:
-            df_summary = pd.DataFrame(chat_infos)
-            df_summary = df_summary[['filename', 'chat_name', 'message_count', 'type', 'last_time']]
-            df_summary.to_csv(OUTPUT_SUMMARY, index=False, encoding='utf-8-sig')
+            columns = ['filename', 'chat_name', 'message_count', 'type', 'last_time']
+            rows = ([info[column] for column in columns] for info in chat_infos)
+            core.write_frequency_csv(rows, columns, OUTPUT_SUMMARY)
             print(f"聊天汇总已保存: {OUTPUT_SUMMARY}")
             
             print("\n聊天记录汇总:")
@@ -524,6 +811,120 @@ def save_combined_results(wordcloud, word_counts, chat_infos, stats):
     
     return True
 
+def render_batch(jobs, stage, profiler=None):
+    """
+    批量生成词云图片（RENDER_WORKERS 个进程并行），逐张输出结果
+    """
+    font_path = core.find_chinese_font()
+    with core.profile_stage(profiler, stage, len(jobs)):
+        for output_image, error in core.render_wordclouds(jobs, RENDER_WORKERS,
+                                                          **get_render_options(font_path)):
+            if error is not None:
+                print(f"  生成 {output_image} 失败: {error}")
+            else:
+                print(f"  ✓ {output_image}")
+
+def save_bucket_results(bucket_counts, profiler=None):
+    """
+    生成并保存每个时间段的词云，各时间段的词频保存在同一个CSV中
+    """
+    try:
+        os.makedirs(TIME_BUCKET_DIR, exist_ok=True)
+    except OSError as e:
+        print(f"无法创建文件夹 {TIME_BUCKET_DIR}: {e}")
+        return
+    
+    jobs = core.make_render_jobs(bucket_counts.items(), TIME_BUCKET_DIR)
+    print(f"\n正在生成 {len(jobs)} 张时间段词云 (进程数: {RENDER_WORKERS or os.cpu_count()})...")
+    render_batch(jobs, "render_buckets", profiler)
+    
+    output_stats = os.path.join(TIME_BUCKET_DIR, "time_word_frequency.csv")
+    try:
+        rows = [(bucket, word, count)
+                for bucket, word_counts in bucket_counts.items()
+                for word, count in word_counts.most_common()]
+        core.save_frequency_table(rows, ['时间段', '词语', '频次'], output_stats, EXPORT_PARQUET)
+        print(f"时间段词频统计已保存: {output_stats}")
+    except Exception as e:
+        print(f"保存时间段词频统计失败: {e}")
+
+def save_sender_results(sender_matrix, profiler=None):
+    """
+    生成并保存每个发送者的词云，所有人的词频保存在同一个CSV中
+    """
+    try:
+        os.makedirs(SENDER_DIR, exist_ok=True)
+    except OSError as e:
+        print(f"无法创建文件夹 {SENDER_DIR}: {e}")
+        return
+    
+    # 文件名按消息数排名编号，消息太少的人跳过但不占用其他人的编号
+    named_counts = [(sender, sender_matrix.sender_counts(sender)
+                     if message_count >= SENDER_MIN_MESSAGES else None)
+                    for sender, message_count in zip(sender_matrix.senders, sender_matrix.message_counts)]
+    jobs = core.make_render_jobs(named_counts, SENDER_DIR, numbered=True)
+    print(f"\n正在生成 {len(jobs)} 张个人词云 (消息数不少于 {SENDER_MIN_MESSAGES} 条，"
+          f"进程数: {RENDER_WORKERS or os.cpu_count()})...")
+    render_batch(jobs, "render_senders", profiler)
+    
+    output_stats = os.path.join(SENDER_DIR, "sender_word_frequency.csv")
+    try:
+        rows = list(sender_matrix.iter_entries())
+        core.save_frequency_table(rows, ['发送者', '词语', '频次'], output_stats, EXPORT_PARQUET)
+        print(f"个人词频统计已保存: {output_stats}")
+    except Exception as e:
+        print(f"保存个人词频统计失败: {e}")
+
+def save_phrase_results(ngrams, profiler=None):
+    """
+    保存词组统计并生成词组词云（词组已在分词时统计好，不需要重新读取聊天记录）
+    """
+    with core.profile_stage(profiler, "phrases", len(ngrams)):
+        phrases = ngrams.phrases(PHRASE_MIN_COUNT, PHRASE_MIN_PMI)
+    
+    print(f"\n统计到 {len(ngrams)} 个不同词组，出现不少于 {PHRASE_MIN_COUNT} 次"
+          f"{'' if PHRASE_MIN_PMI is None else f'且PMI不低于 {PHRASE_MIN_PMI}'}的有 {len(phrases)} 个")
+    if ngrams.pruned:
+        print(f"  词组过多，已删掉 {ngrams.pruned} 个出现次数很少的词组（其余词组的次数最多少算 {ngrams.count_error} 次）")
+    
+    if not phrases:
+        print("没有符合条件的词组，不生成词组词云")
+        return
+    
+    print("\n最常见的20个词组:")
+    for i, (phrase, count, pmi, _) in enumerate(phrases[:20], 1):
+        print(f"  {i:2d}. {phrase:12s}: {count:6d}次  PMI {pmi:5.2f}")
+    
+    try:
+        core.save_frequency_table(phrases, ['词组', '频次', 'PMI', '词数'], OUTPUT_PHRASE_STATS,
+                                  EXPORT_PARQUET, dictionary=False)
+        print(f"词组统计已保存: {OUTPUT_PHRASE_STATS}")
+    except Exception as e:
+        print(f"保存词组统计失败: {e}")
+    
+    weights = core.get_phrase_weights(phrases, PHRASE_SCORE)
+    if not weights:
+        print("没有PMI大于0的词组，不生成词组词云")
+        return
+    
+    print("正在生成词组词云...")
+    try:
+        wc = core.render_wordcloud(weights, profiler=profiler, stage_suffix="_phrases",
+                                   **get_render_options(core.find_chinese_font()))
+        wc.to_file(OUTPUT_PHRASE_IMAGE)
+        print(f"词组词云已保存: {OUTPUT_PHRASE_IMAGE}")
+    except Exception as e:
+        print(f"生成词组词云失败: {e}")
+
+def save_group_results(bucket_counts, sender_matrix, profiler=None):
+    """
+    保存分组统计的结果（没有统计的分组为 None）
+    """
+    if bucket_counts is not None:
+        save_bucket_results(bucket_counts, profiler)
+    if sender_matrix is not None:
+        save_sender_results(sender_matrix, profiler)
+
 def display_combined_wordcloud(wordcloud, word_counts, chat_infos, stats):
     """
     显示综合词云
@@ -531,6 +932,10 @@ def display_combined_wordcloud(wordcloud, word_counts, chat_infos, stats):
     if not wordcloud:
         return
     
+    import matplotlib.pyplot as plt
+    
+    chart_font = core.get_chart_font()
+    
     # 创建大图
     fig = plt.figure(figsize=(18, 10))
     
@@ -562,7 +967,7 @@ def display_combined_wordcloud(wordcloud, word_counts, chat_infos, stats):
         y_pos = range(len(words))
         bars = ax2.barh(y_pos, freqs, align='center', alpha=0.7, color='steelblue')
         ax2.set_yticks(y_pos)
-        ax2.set_yticklabels(words, fontproperties='SimHei')
+        ax2.set_yticklabels(words, fontproperties=chart_font)
         ax2.invert_yaxis()
         ax2.set_xlabel('出现次数')
         ax2.set_title('高频词Top 15')
@@ -585,7 +990,7 @@ def display_combined_wordcloud(wordcloud, word_counts, chat_infos, stats):
         y_pos = range(len(chat_labels))
         bars = ax3.barh(y_pos, message_counts, align='center', alpha=0.7, color='lightcoral')
         ax3.set_yticks(y_pos)
-        ax3.set_yticklabels(chat_labels, fontproperties='SimHei', fontsize=9)
+        ax3.set_yticklabels(chat_labels, fontproperties=chart_font, fontsize=9)
         ax3.invert_yaxis()
         ax3.set_xlabel('消息数量')
         ax3.set_title('聊天记录统计')
@@ -609,12 +1014,45 @@ def display_combined_wordcloud(wordcloud, word_counts, chat_infos, stats):
 # 第六部分：主程序
 # ============================================
 
-import math  # 用于enhance_frequency_distribution函数中的math.log
+def create_profiler():
+    """
+    创建性能统计对象，PROFILE_REPORT 为 False 时返回 None（不记录）
+    """
+    if not PROFILE_REPORT:
+        return None
+    
+    return core.PipelineProfiler("multi_chat_wordcloud.py", settings={
+        "analyze_who": ANALYZE_WHO,
+        "stream_loading": STREAM_LOADING,
+        "stream_pipeline": STREAM_PIPELINE,
+        "load_workers": LOAD_WORKERS,
+        "load_use_processes": LOAD_USE_PROCESSES,
+        "parallel_workers": PARALLEL_WORKERS,
+        "token_cache": bool(TOKEN_CACHE_FILE),
+        "incremental": bool(INCREMENTAL_INDEX_FILE),
+        "time_bucket": TIME_BUCKET,
+        "render_workers": RENDER_WORKERS,
+        "max_words": MAX_WORDS,
+        "width": WIDTH,
+        "height": HEIGHT,
+        "phrase_cloud": PHRASE_CLOUD and not INCREMENTAL_INDEX_FILE,
+    })
+
+def create_ngram_counter():
+    """
+    创建词组统计对象，PHRASE_CLOUD 为 False 或增量统计时返回 None（不统计）
+    """
+    if not PHRASE_CLOUD or INCREMENTAL_INDEX_FILE:
+        return None
+    
+    return core.NgramCounter(STOP_WORD_SET, PHRASE_MAX_N, PHRASE_MAX_ENTRIES)
 
 def main():
     """
     主函数
     """
+    profiler = create_profiler()
+    
     print("=" * 70)
     print("多微信聊天记录词云图生成器")
     print("=" * 70)
@@ -624,45 +1062,103 @@ def main():
     print(f"排除系统消息: {EXCLUDE_SYSTEM_MESSAGES}")
     print("=" * 70)
     
+    # 先找文件再加载分词词典等较慢的部分，没有文件时马上退出
+    json_files = scan_chat_files()
+    if not json_files:
+        input("按回车键退出...")
+        return
+    
+    # 先加载分词词典（读取缓存），之后创建的分词进程直接使用同样的词典
+    with core.profile_stage(profiler, "jieba_init"):
+        core.init_jieba(core.get_dictionary_words(CUSTOM_WORDS, STOP_WORD_SET))
+    ngrams = create_ngram_counter()
+    
+    if INCREMENTAL_INDEX_FILE:
+        # 增量统计：只处理上次运行之后新增的消息
+        print(f"\n开始增量统计 (索引文件: {INCREMENTAL_INDEX_FILE})...")
+        if TIME_BUCKET:
+            print("提示：增量统计时不支持按时间段生成词云，忽略 TIME_BUCKET 设置")
+        if SENDER_CLOUDS:
+            print("提示：增量统计时不支持个人词云，忽略 SENDER_CLOUDS 设置")
+        if DEDUP_MESSAGES == "collapse":
+            print("提示：增量统计时不去重，忽略 DEDUP_MESSAGES 设置")
+        if PHRASE_CLOUD:
+            print("提示：增量统计时不支持词组词云，忽略 PHRASE_CLOUD 设置")
+        # 增量统计时读取、过滤、清洗和分词是逐个文件交替进行的，合并记录为一个阶段
+        with core.profile_stage(profiler, "incremental_update") as record:
+            word_counts, chat_infos, stats, valid_count = update_incremental_index(
+                json_files, INCREMENTAL_INDEX_FILE)
+            record["items"] = stats['total']
+        
+        if not chat_infos:
+            print("错误：没有可用的聊天记录数据")
+            input("按回车键退出...")
+            return
+        
+        wordcloud, word_counts = build_combined_wordcloud(word_counts, profiler)
+        finish_results(wordcloud, word_counts, chat_infos, stats, valid_count, profiler)
+        return
+    
+    if STREAM_PIPELINE:
+        stream_results(json_files, profiler, ngrams)
+        return
+    
     # 1. 加载所有聊天记录
-    all_messages, chat_infos = load_all_chat_files()
+    if STREAM_LOADING:
+        # 流式读取：边读边过滤，不在内存中保留原始消息
+        chat_infos = []
+        all_messages = stream_all_chat_files(json_files, chat_infos)
+        print(f"\n开始流式加载并过滤消息 (分析对象: {ANALYZE_WHO})...")
+    else:
+        with core.profile_stage(profiler, "load") as record:
+            all_messages, chat_infos = load_all_chat_files(json_files)
+            record["items"] = len(all_messages)
+        
+        if not all_messages or not chat_infos:
+            print("错误：没有可用的聊天记录数据")
+            input("按回车键退出...")
+            return
+        
+        print(f"\n✓ 成功加载 {len(chat_infos)} 个聊天记录，共 {len(all_messages)} 条消息")
+        print(f"\n正在过滤消息 (分析对象: {ANALYZE_WHO})...")
+    
+    # 2. 过滤消息（流式读取时读取和过滤是边读边做的，合并记录为一个阶段）
+    with core.profile_stage(profiler, "load_filter" if STREAM_LOADING else "filter") as record:
+        filtered_messages, stats = core.filter_messages(
+            all_messages, 
+            who=ANALYZE_WHO,
+            exclude_system=EXCLUDE_SYSTEM_MESSAGES
+        )
+        record["items"] = stats['total']
     
-    if not all_messages or not chat_infos:
+    if not chat_infos:
         print("错误：没有可用的聊天记录数据")
         input("按回车键退出...")
         return
     
-    print(f"\n✓ 成功加载 {len(chat_infos)} 个聊天记录，共 {len(all_messages)} 条消息")
-    
-    # 2. 过滤消息
-    print(f"\n正在过滤消息 (分析对象: {ANALYZE_WHO})...")
-    filtered_messages, stats = filter_messages(
-        all_messages, 
-        who=ANALYZE_WHO,
-        exclude_system=EXCLUDE_SYSTEM_MESSAGES
-    )
-    
     if not filtered_messages:
         print("过滤后没有消息可分析")
         input("按回车键退出...")
         return
     
+    if TIME_BUCKET or SENDER_CLOUDS:
+        # 3-4. 按时间段和发送者统计，同时得到全部消息的词频
+        word_counts, bucket_counts, sender_matrix = count_by_group(filtered_messages, profiler, ngrams)
+        wordcloud, word_counts = build_combined_wordcloud(word_counts, profiler)
+        if wordcloud:
+            save_group_results(bucket_counts, sender_matrix, profiler)
+        finish_results(wordcloud, word_counts, chat_infos, stats, len(filtered_messages), profiler, ngrams)
+        return
+    
     # 3. 提取文本
     print("\n正在提取和清洗文本...")
     
-    # 获取所有聊天对象的名字
-    other_names = set()
-    for msg in filtered_messages:
-        if msg.get('isSend') == 0:  # 对方发送
-            sender = msg.get('sender', '')
-            if sender:
-                other_names.add(sender)
-    
-    texts = extract_texts_from_messages(
-        filtered_messages, 
-        include_names=INCLUDE_NAMES_IN_WORDS,
-        names=other_names
-    )
+    with core.profile_stage(profiler, "clean", len(filtered_messages)):
+        texts = extract_texts_from_messages(
+            filtered_messages, 
+            include_names=INCLUDE_NAMES_IN_WORDS,
+            names=get_other_names(filtered_messages)
+        )
     
     if not texts:
         print("错误：没有提取到有效文本")
@@ -670,8 +1166,68 @@ def main():
         return
     
     # 4. 生成综合词云
-    wordcloud, word_counts = generate_combined_wordcloud(texts, chat_infos)
+    wordcloud, word_counts = generate_combined_wordcloud(texts, chat_infos, profiler, ngrams)
     
+    finish_results(wordcloud, word_counts, chat_infos, stats, len(filtered_messages), profiler, ngrams)
+
+def stream_results(json_files, profiler=None, ngrams=None):
+    """
+    全程流式处理：各阶段都是生成器，消息逐条经过过滤、清洗，
+    攒够一批就分词并累加到词频中，不保存消息和文本列表
+    """
+    print(f"\n开始流式统计 (分析对象: {ANALYZE_WHO})...")
+    chat_infos = []
+    stats = core.new_message_stats()
+    progress = {}
+    
+    messages = stream_all_chat_files(json_files, chat_infos)
+    rows = core.iter_filtered_messages(
+        messages,
+        who=ANALYZE_WHO,
+        exclude_system=EXCLUDE_SYSTEM_MESSAGES,
+        stats=stats
+    )
+    
+    # 读取、过滤、清洗、分词、统计交替进行，合并记录为一个阶段
+    bucket_counts = sender_matrix = None
+    if TIME_BUCKET or SENDER_CLOUDS:
+        word_counts, bucket_counts, sender_matrix = count_by_group(rows, profiler, ngrams)
+        core.print_message_stats(stats)
+    else:
+        with core.profile_stage(profiler, "stream_count") as record:
+            # 聊天对象的名字边读边收集（拆成单字的名字不会计入词频，只影响文本条数）
+            texts = iter_texts_from_messages(
+                rows,
+                include_names=INCLUDE_NAMES_IN_WORDS,
+                names=stats['other_names'],
+                progress=progress
+            )
+            word_counts = count_texts_streaming(texts, ngrams)
+            record["items"] = stats['total']
+        
+        core.print_message_stats(stats)
+        print(f"提取到 {progress.get('texts', 0)} 条文本，共约 {progress.get('chars', 0)} 个字符")
+    
+    if not chat_infos:
+        print("错误：没有可用的聊天记录数据")
+        input("按回车键退出...")
+        return
+    
+    if not stats['valid']:
+        print("过滤后没有消息可分析")
+        input("按回车键退出...")
+        return
+    
+    wordcloud, word_counts = build_combined_wordcloud(word_counts, profiler)
+    if wordcloud:
+        save_group_results(bucket_counts, sender_matrix, profiler)
+    finish_results(wordcloud, word_counts, chat_infos, stats, stats['valid'], profiler, ngrams)
+
+def finish_results(wordcloud, word_counts, chat_infos, stats, valid_count, profiler=None, ngrams=None):
+    """
+    保存、显示结果并输出汇总
+    ngrams: 同时统计的 core.NgramCounter，不为 None 时保存词组统计和词组词云
+    """
     if not wordcloud:
         print("生成词云失败")
         input("按回车键退出...")
@@ -679,7 +1235,15 @@ def main():
     
     # 5. 保存和显示结果
     print("\n正在保存结果...")
-    save_combined_results(wordcloud, word_counts, chat_infos, stats)
+    with core.profile_stage(profiler, "save", len(word_counts)):
+        save_combined_results(wordcloud, word_counts, chat_infos, stats)
+    if ngrams is not None:
+        save_phrase_results(ngrams, profiler)
+    
+    # 显示窗口要等用户关闭，不计入性能报告
+    if profiler is not None:
+        profiler.messages = stats['total']
+        profiler.save_report(core.get_profile_path(OUTPUT_STATS))
     
     print("\n正在显示词云图...")
     display_combined_wordcloud(wordcloud, word_counts, chat_infos, stats)
@@ -688,13 +1252,22 @@ def main():
     print("处理完成！")
     print("=" * 70)
     print(f"📁 分析文件: {len(chat_infos)} 个聊天记录")
-    print(f"💬 总消息数: {len(all_messages)} 条")
-    print(f"📊 有效消息: {len(filtered_messages)} 条")
+    print(f"💬 总消息数: {stats['total']} 条")
+    print(f"📊 有效消息: {valid_count} 条")
     print(f"🔤 不同词语: {len(word_counts)} 个")
     print(f"🖼️  词云图片: {OUTPUT_IMAGE}")
     print(f"📈 词频统计: {OUTPUT_STATS}")
     if chat_infos:
         print(f"📋 聊天汇总: {OUTPUT_SUMMARY}")
+    if profiler is not None:
+        print(f"⏱️  性能报告: {core.get_profile_path(OUTPUT_STATS)}")
+    if TIME_BUCKET and not INCREMENTAL_INDEX_FILE:
+        print(f"🗓️  时间段词云: {TIME_BUCKET_DIR}")
+    if SENDER_CLOUDS and not INCREMENTAL_INDEX_FILE:
+        print(f"👥 个人词云: {SENDER_DIR}")
+    if ngrams is not None:
+        print(f"🧩 词组词云: {OUTPUT_PHRASE_IMAGE}")
+        print(f"🔗 词组统计: {OUTPUT_PHRASE_STATS}")
     print("=" * 70)
     
     input("按回车键退出程序...")
@@ -15,6 +15,8 @@ from PIL import Image
 import numpy as np
 import os
 
+import wordcloud_core as core
+
 # ============================================
 # 第一部分：设置参数（你可以修改这里）
 # ============================================
@@ -170,6 +172,10 @@ def filter_messages(messages, who="all", exclude_system=True):
     
     return filtered
 
+# 排除模式启动时编译一次；合并的正则只用来快速判断文本中有没有要移除的内容
+REMOVE_REGEX = re.compile('|'.join(f'(?:{pattern})' for pattern in REMOVE_PATTERNS))
+REMOVE_REGEXES = [re.compile(pattern) for pattern in REMOVE_PATTERNS]
+
 def clean_text(text):
     """
     清洗文本，移除不需要的内容
@@ -177,9 +183,10 @@ def clean_text(text):
     if not isinstance(text, str):
         return ""
     
-    # 移除各种模式匹配的内容
-    for pattern in REMOVE_PATTERNS:
-        text = re.sub(pattern, '', text)
+    # 有要移除的内容时按顺序逐个移除（几个模式的匹配有重叠时与逐个 re.sub 的结果相同）
+    if REMOVE_REGEX.search(text):
+        for regex in REMOVE_REGEXES:
+            text = regex.sub('', text)
     
     # 移除空格和换行
     text = text.replace('\n', ' ').replace('\r', ' ').strip()
@@ -203,7 +210,8 @@ def generate_wordcloud(texts, max_words=200, background_color="white"):
     # 将所有文本合并
     all_text = ' '.join(texts)
     
-    # 使用jieba分词
+    # 使用jieba分词（分词词典从缓存读取，多字停用词保持完整）
+    core.init_jieba(core.get_dictionary_words([], STOP_WORDS))
     words = jieba.lcut(all_text)
     
     # 过滤停用词和单字
@@ -233,24 +241,8 @@ def generate_wordcloud(texts, max_words=200, background_color="white"):
     # 创建词云
     print("\n正在生成词云...")
     
-    # 确保有中文字体
-    font_path = None
-    possible_fonts = [
-        "C:/Windows/Fonts/simhei.ttf",  # Windows黑体
-        "C:/Windows/Fonts/msyh.ttc",    # Windows微软雅黑
-        "C:/Windows/Fonts/simsun.ttc",  # Windows宋体
-        "simhei.ttf",  # 当前目录
-    ]
-    
-    for font in possible_fonts:
-        if os.path.exists(font):
-            font_path = font
-            print(f"使用字体: {font}")
-            break
-    
-    if not font_path:
-        print("警告：未找到中文字体，词云可能无法显示中文")
-        font_path = None
+    # 确保有中文字体（与其他脚本共用字体查找和缓存）
+    font_path = core.find_chinese_font()
     
     # 生成词云对象
     wc = WordCloud(
@@ -312,6 +304,7 @@ def display_wordcloud(wordcloud):
     if not wordcloud:
         return
     
+    core.get_chart_font()  # 标题和统计信息使用中文字体
     plt.figure(figsize=(12, 8))
     plt.imshow(wordcloud, interpolation="bilinear")
     plt.axis("off")
@@ -3,16 +3,9 @@
 优化了词频大小差异
 """
 
-import json
-import re
-import jieba
-from collections import Counter
-from wordcloud import WordCloud, ImageColorGenerator
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
 import os
-import math
+
+import wordcloud_core as core
 
 # ============================================
 # 第一部分：设置参数（你可以修改这里）
@@ -23,10 +16,17 @@ JSON_FILE = "chat.json"
 
 # 2. 分析谁的消息？
 # "all" - 所有人的消息，"me" - 只分析我发的消息，"other" - 只分析对方发的消息
+# 也可以写成列表，如 ["all", "me", "other"]，只读取和分词一次，同时生成多张词云
 ANALYZE_WHO = "all"
 
 # 3. 排除系统消息吗？
 EXCLUDE_SYSTEM_MESSAGES = True
+# 全程流式处理：读取、过滤、清洗、分词、统计逐条衔接，不保存消息和文本列表，
+# 内存占用只与词汇量有关，适合很大的聊天记录文件
+STREAM_PIPELINE = False
+# 重复消息（转发刷屏、表情文字）的处理：None=逐条分词统计，
+# "count"=相同的文本只分词一次、词频乘以出现次数（结果不变），"collapse"=重复的文本只计一次（流式处理时不去重）
+DEDUP_MESSAGES = "count"
 
 # 4. 词云显示设置
 MAX_WORDS = 200           # 最多显示多少个词
@@ -58,6 +58,8 @@ STOP_WORDS = [
     "所以", "但是", "然后", "而且", "其实", "还是",
     "就是", "就是", "就是", "就是", "就是", "就是"
 ]
+STOP_WORDS_FILES = []  # 停用词文件（每行一个词，# 开头为注释），如 ["stopwords.txt"]
+CUSTOM_WORDS = []  # 自定义词语（人名、昵称、常用语等），分词时保持完整；分词词典建好后会缓存，以后启动更快
 
 # 8. 排除特定内容
 REMOVE_PATTERNS = [
@@ -71,394 +73,138 @@ REMOVE_PATTERNS = [
 # 9. 输出文件名
 OUTPUT_IMAGE = "wechat_wordcloud_enhanced.png"
 OUTPUT_STATS = "word_frequency_enhanced.csv"
+EXPORT_PARQUET = False  # 是否再保存一份 Parquet 列式词频文件（同名 .parquet，需要安装 pyarrow）
+# 同时分析多个视角时，文件名后面会自动加上 _all / _me / _other
+PROFILE_REPORT = True  # 是否保存各阶段耗时和内存占用报告（JSON，放在词频统计文件旁边）
 
 # ============================================
-# 第二部分：读取和处理数据
+# 第二部分：统计词频和生成词云
 # ============================================
 
-def load_wechat_data(file_path):
-    """
-    读取微信聊天记录的JSON文件
-    """
-    print(f"正在读取文件: {file_path}")
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if 'messages' not in data:
-            print("错误：JSON文件中没有找到'messages'字段")
-            return []
-        
-        messages = data['messages']
-        print(f"成功读取 {len(messages)} 条消息")
-        
-        if 'session' in data:
-            session_info = data['session']
-            print(f"会话名称: {session_info.get('nickname', '未知')}")
-            print(f"消息总数: {session_info.get('messageCount', len(messages))}")
-        
-        return messages
-        
-    except Exception as e:
-        print(f"读取文件时发生错误: {e}")
-        return []
+# 所有排除模式合并成一个正则，启动时编译一次，清洗时只需扫描一遍文本
+REMOVE_REGEX = core.compile_remove_patterns(REMOVE_PATTERNS)
 
-def filter_messages(messages, who="all", exclude_system=True):
-    """
-    过滤消息
-    """
-    filtered = []
-    
-    for msg in messages:
-        msg_type = msg.get('type', '')
-        content = msg.get('content', '')
-        
-        if not content or not isinstance(content, str):
-            continue
-            
-        if exclude_system and msg_type == "系统消息":
-            continue
-            
-        is_send = msg.get('isSend')
-        
-        if who == "me" and is_send != 1:
-            continue
-        elif who == "other" and is_send != 0:
-            continue
-        elif who not in ["all", "me", "other"]:
-            continue
-            
-        filtered.append({
-            'content': content,
-            'type': msg_type,
-            'sender': msg.get('senderDisplayName', ''),
-            'isSend': is_send,
-            'time': msg.get('formattedTime', '')
-        })
-    
-    print(f"过滤后得到 {len(filtered)} 条文本消息")
-    return filtered
+# 停用词和停用词文件合并成一个 frozenset，查找只需一次哈希
+STOP_WORD_SET = core.build_stop_words(STOP_WORDS, STOP_WORDS_FILES)
 
-def clean_text(text):
+def get_views():
     """
-    清洗文本
+    要分析的视角列表
     """
-    if not isinstance(text, str):
-        return ""
-    
-    for pattern in REMOVE_PATTERNS:
-        text = re.sub(pattern, '', text)
-    
-    return text.replace('\n', ' ').replace('\r', ' ').strip()
+    if isinstance(ANALYZE_WHO, str):
+        return [ANALYZE_WHO]
+    return list(ANALYZE_WHO)
 
-# ============================================
-# 第三部分：增强的词云生成
-# ============================================
-
-def enhance_frequency_distribution(word_counts, exponent=1.5, use_log_scale=True):
+def get_output_path(path, who, views):
     """
-    增强词频分布，使大小差异更明显
-    word_counts: 词频字典
-    exponent: 指数，大于1会放大高频词，小于1会缩小高频词
-    use_log_scale: 是否使用对数缩放
+    同时分析多个视角时，在文件名后面加上视角，避免互相覆盖
     """
-    if not word_counts:
-        return {}
-    
-    enhanced_counts = {}
-    
-    # 获取原始频率
-    frequencies = list(word_counts.values())
-    
-    if len(frequencies) < 2:
-        return word_counts  # 只有一个词，无需处理
-    
-    min_freq = min(frequencies)
-    max_freq = max(frequencies)
-    
-    print(f"原始频率范围: {min_freq} - {max_freq}")
-    
-    for word, freq in word_counts.items():
-        if use_log_scale:
-            # 使用对数缩放，减小极端值的影响
-            enhanced = math.log(freq + 1) ** exponent
-        else:
-            # 使用指数缩放
-            enhanced = freq ** exponent
-        
-        enhanced_counts[word] = enhanced
-    
-    # 将增强后的值缩放到合适的范围
-    enhanced_values = list(enhanced_counts.values())
-    min_enhanced = min(enhanced_values)
-    max_enhanced = max(enhanced_values)
-    
-    # 缩放到1-100的范围
-    scaled_counts = {}
-    for word, enhanced in enhanced_counts.items():
-        if max_enhanced > min_enhanced:
-            # 线性缩放
-            scaled = 1 + 99 * (enhanced - min_enhanced) / (max_enhanced - min_enhanced)
-        else:
-            scaled = 50  # 所有值相同的情况
-        
-        scaled_counts[word] = scaled
-    
-    return scaled_counts
+    if len(views) == 1:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}_{who}{ext}"
 
-def analyze_word_frequency_distribution(word_counts):
+def stream_count_views(views, profiler=None):
     """
-    分析词频分布
+    流式统计各视角的词频：逐条读取和过滤消息，清洗后攒够一批就分词
+    返回 ({视角: 词频}, 消息统计)，读取失败时词频为 None
     """
-    if not word_counts:
-        return
-    
-    frequencies = list(word_counts.values())
-    frequencies.sort(reverse=True)
-    
-    print("\n" + "="*50)
-    print("词频分布分析:")
-    print("="*50)
+    print(f"正在流式读取文件: {JSON_FILE}")
+    if DEDUP_MESSAGES == "collapse":
+        print("提示：流式统计时不去重，忽略 DEDUP_MESSAGES 设置")
+    stream = core.ChatFileStream(JSON_FILE)
+    stats = core.new_message_stats()
+    rows = core.iter_filtered_messages(
+        stream,
+        who=views[0] if len(views) == 1 else "all",
+        exclude_system=EXCLUDE_SYSTEM_MESSAGES,
+        stats=stats
+    )
     
-    if len(frequencies) > 0:
-        print(f"最高频词: {frequencies[0]} 次")
-        print(f"最低频词: {frequencies[-1]} 次")
-        print(f"词频极差: {frequencies[0] - frequencies[-1]}")
+    try:
+        view_counts = core.count_words_by_view(rows, views, REMOVE_REGEX, STOP_WORD_SET, profiler=profiler)
+    except Exception as e:
+        print(f"读取文件时发生错误: {e}")
+        return None, stats
     
-    if len(frequencies) >= 10:
-        print(f"前10%的词频: {frequencies[:len(frequencies)//10]}")
-        print(f"后10%的词频: {frequencies[-len(frequencies)//10:]}")
+    if not stream.has_messages:
+        print("错误：JSON文件中没有找到'messages'字段")
+        return None, stats
     
-    # 计算基尼系数（衡量不均衡程度）
-    total = sum(frequencies)
-    if total > 0:
-        cumulative_sum = 0
-        gini_sum = 0
-        n = len(frequencies)
-        
-        for i, freq in enumerate(sorted(frequencies)):
-            cumulative_sum += freq
-            gini_sum += (i + 1) * freq
-        
-        gini = (2 * gini_sum) / (n * total) - (n + 1) / n
-        print(f"基尼系数: {gini:.3f} (越接近1表示分布越不均衡)")
+    session = stream.meta.get('session')
+    if session is not None:
+        print(f"会话名称: {session.get('nickname', '未知')}")
+    core.print_message_stats(stats)
     
-    print("="*50)
+    return view_counts, stats
 
-def generate_enhanced_wordcloud(texts, max_words=200, background_color="white"):
+def generate_enhanced_wordcloud(word_counts, font_path=None, profiler=None, stage_suffix=""):
     """
     生成增强版的词云图
     """
-    if not texts:
-        print("错误：没有文本可以生成词云")
-        return None, None
-    
-    print("正在分词和统计词频...")
-    
-    # 将所有文本合并
-    all_text = ' '.join(texts)
-    
-    # 使用jieba分词
-    words = jieba.lcut(all_text)
-    
-    # 过滤停用词和单字
-    filtered_words = []
-    for word in words:
-        word = word.strip()
-        if (len(word) > 1 and
-            word not in STOP_WORDS and
-            not word.isdigit() and
-            not re.match(r'^[^\u4e00-\u9fa5]+$', word)):
-            filtered_words.append(word)
-    
-    # 统计原始词频
-    raw_word_counts = Counter(filtered_words)
-    
-    if not raw_word_counts:
+    if not word_counts:
         print("错误：分词后没有有效的词语")
-        return None, None
+        return None
     
-    print(f"分词得到 {len(filtered_words)} 个有效词语，{len(raw_word_counts)} 个不同词语")
+    print(f"分词得到 {sum(word_counts.values())} 个有效词语，{len(word_counts)} 个不同词语")
     
     # 分析原始词频分布
-    analyze_word_frequency_distribution(raw_word_counts)
-    
-    # 增强词频分布
-    print(f"\n应用增强参数: 指数={FREQUENCY_EXPONENT}, 对数缩放={USE_LOG_SCALE}")
-    enhanced_counts = enhance_frequency_distribution(
-        raw_word_counts, 
-        exponent=FREQUENCY_EXPONENT,
-        use_log_scale=USE_LOG_SCALE
-    )
+    core.analyze_word_frequency_distribution(word_counts)
     
     # 显示最常见的20个词
     print("\n原始词频前20名:")
-    for word, count in raw_word_counts.most_common(20):
+    for word, count in word_counts.most_common(20):
         print(f"  {word}: {count}次")
     
-    # 创建词云
+    # 增强词频分布并生成词云
+    print(f"\n应用增强参数: 指数={FREQUENCY_EXPONENT}, 对数缩放={USE_LOG_SCALE}")
     print("\n正在生成增强版词云...")
-    
-    # 确保有中文字体
-    font_path = None
-    possible_fonts = [
-        "C:/Windows/Fonts/simhei.ttf",
-        "C:/Windows/Fonts/msyh.ttc",
-        "C:/Windows/Fonts/simsun.ttc",
-        "simhei.ttf",
-    ]
-    
-    for font in possible_fonts:
-        if os.path.exists(font):
-            font_path = font
-            print(f"使用字体: {font}")
-            break
-    
-    if not font_path:
-        print("警告：未找到中文字体，词云可能无法显示中文")
-        font_path = None
-    
-    # 生成词云对象
-    wc = WordCloud(
+    wc = core.render_wordcloud(
+        word_counts,
         font_path=font_path,
+        max_words=MAX_WORDS,
+        background_color=BACKGROUND_COLOR,
         width=WIDTH,
         height=HEIGHT,
-        background_color=background_color,
-        max_words=max_words,
-        max_font_size=FONT_SIZE_RANGE[1],
-        min_font_size=FONT_SIZE_RANGE[0],
+        font_size_range=FONT_SIZE_RANGE,
+        exponent=FREQUENCY_EXPONENT,
+        use_log_scale=USE_LOG_SCALE,
         relative_scaling=RELATIVE_SCALING,
-        random_state=42,
-        collocations=False,
         colormap=COLOR_SCHEME if not RANDOM_COLOR else None,
-        prefer_horizontal=0.9,  # 水平词的比例
-        scale=2,  # 生成图片的缩放比例
-        contour_width=0,  # 轮廓宽度
-        contour_color='steelblue',  # 轮廓颜色
+        profiler=profiler,
+        stage_suffix=stage_suffix
     )
     
-    # 使用增强后的词频生成词云
-    wc.generate_from_frequencies(enhanced_counts)
-    
     print(f"词云已生成:")
     print(f"  - 字体大小范围: {FONT_SIZE_RANGE[0]}-{FONT_SIZE_RANGE[1]}")
     print(f"  - 相对缩放系数: {RELATIVE_SCALING}")
     print(f"  - 包含词语数量: {len(wc.words_)}")
     
-    return wc, raw_word_counts
-
-def save_enhanced_results(wordcloud, word_counts):
-    """
-    保存结果
-    """
-    if not wordcloud:
-        return False
-    
-    # 保存词云图片
-    try:
-        wordcloud.to_file(OUTPUT_IMAGE)
-        print(f"词云图片已保存: {OUTPUT_IMAGE}")
-    except Exception as e:
-        print(f"保存图片失败: {e}")
-        return False
-    
-    # 保存词频统计
-    try:
-        df = pd.DataFrame(
-            word_counts.most_common(),
-            columns=['词语', '频次']
-        )
-        df.to_csv(OUTPUT_STATS, index=False, encoding='utf-8-sig')
-        print(f"词频统计已保存: {OUTPUT_STATS}")
-        
-        # 显示前20个词
-        print("\n词频前20名:")
-        for i, row in df.head(20).iterrows():
-            print(f"  {i+1:2d}. {row['词语']:10s}: {row['频次']:4d}次")
-        
-        # 计算并显示差异统计
-        if len(df) >= 2:
-            max_freq = df.iloc[0]['频次']
-            min_freq = df.iloc[-1]['频次']
-            ratio = max_freq / min_freq if min_freq > 0 else 0
-            print(f"\n词频差异统计:")
-            print(f"  最高频词 '{df.iloc[0]['词语']}': {max_freq} 次")
-            print(f"  最低频词 '{df.iloc[-1]['词语']}': {min_freq} 次")
-            print(f"  频次比: {ratio:.1f}:1")
-            
-    except Exception as e:
-        print(f"保存词频统计失败: {e}")
-    
-    return True
-
-def display_enhanced_wordcloud(wordcloud, word_counts):
-    """
-    显示增强版词云
-    """
-    if not wordcloud:
-        return
-    
-    # 创建子图
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 8))
-    
-    # 左图：词云
-    ax1.imshow(wordcloud, interpolation="bilinear")
-    ax1.axis("off")
-    ax1.set_title("微信聊天记录词云图（增强版）", fontsize=16, fontweight='bold')
-    
-    # 添加参数信息
-    params_text = f"参数设置:\n"
-    params_text += f"字体大小: {FONT_SIZE_RANGE[0]}-{FONT_SIZE_RANGE[1]}\n"
-    params_text += f"词频指数: {FREQUENCY_EXPONENT}\n"
-    params_text += f"对数缩放: {USE_LOG_SCALE}\n"
-    params_text += f"相对缩放: {RELATIVE_SCALING}"
-    
-    ax1.text(0.02, 0.98, params_text, 
-             transform=ax1.transAxes,
-             verticalalignment='top',
-             bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8),
-             fontsize=9)
-    
-    # 右图：词频分布柱状图
-    if word_counts and len(word_counts) > 0:
-        # 获取前20个高频词
-        top_words = dict(word_counts.most_common(20))
-        
-        words = list(top_words.keys())
-        freqs = list(top_words.values())
-        
-        # 创建水平柱状图
-        y_pos = range(len(words))
-        bars = ax2.barh(y_pos, freqs, align='center', alpha=0.7, color='steelblue')
-        ax2.set_yticks(y_pos)
-        ax2.set_yticklabels(words, fontproperties='SimHei')
-        ax2.invert_yaxis()  # 最高的在顶部
-        ax2.set_xlabel('出现次数')
-        ax2.set_title('高频词排行榜（前20）')
-        
-        # 在柱状图上显示数值
-        for i, (bar, freq) in enumerate(zip(bars, freqs)):
-            width = bar.get_width()
-            ax2.text(width + max(freqs)*0.01, bar.get_y() + bar.get_height()/2,
-                    f'{freq}', va='center', fontsize=9)
-    
-    plt.suptitle(f"词云分析结果 - 共 {len(word_counts)} 个不同词语", fontsize=14)
-    plt.tight_layout()
-    plt.show()
+    return wc
 
 # ============================================
-# 第四部分：主程序
+# 第三部分：主程序
 # ============================================
 
 def main():
     """
     主函数
     """
+    views = get_views()
+    profiler = None
+    if PROFILE_REPORT:
+        profiler = core.PipelineProfiler(os.path.basename(__file__), settings={
+            "analyze_who": views,
+            "max_words": MAX_WORDS,
+            "width": WIDTH,
+            "height": HEIGHT,
+        })
+    
     print("=" * 60)
     print("微信聊天记录词云图生成器 - 增强版")
     print("=" * 60)
     print(f"参数设置:")
+    print(f"  - 分析对象: {', '.join(views)}")
     print(f"  - 字体大小范围: {FONT_SIZE_RANGE[0]}-{FONT_SIZE_RANGE[1]}")
     print(f"  - 词频指数: {FREQUENCY_EXPONENT}")
     print(f"  - 对数缩放: {USE_LOG_SCALE}")
@@ -472,64 +218,114 @@ def main():
         input("按回车键退出...")
         return
     
-    # 1. 加载数据
-    messages = load_wechat_data(JSON_FILE)
-    if not messages:
-        print("没有可处理的消息")
-        input("按回车键退出...")
-        return
-    
-    # 2. 过滤消息
-    print(f"\n正在过滤消息 (分析对象: {ANALYZE_WHO})...")
-    filtered_messages = filter_messages(
-        messages, 
-        who=ANALYZE_WHO,
-        exclude_system=EXCLUDE_SYSTEM_MESSAGES
-    )
-    
-    if not filtered_messages:
-        print("过滤后没有消息可分析")
-        input("按回车键退出...")
-        return
-    
-    # 3. 提取和清洗文本
-    print("\n正在清洗文本...")
-    texts = []
-    for msg in filtered_messages:
-        cleaned = clean_text(msg['content'])
-        if cleaned:
-            texts.append(cleaned)
+    # 先加载分词词典（读取缓存），自定义词语和多字停用词分词时保持完整
+    with core.profile_stage(profiler, "jieba_init"):
+        core.init_jieba(core.get_dictionary_words(CUSTOM_WORDS, STOP_WORD_SET))
+    
+    if STREAM_PIPELINE:
+        # 1-3. 流式读取、过滤、清洗和分词
+        view_counts, stats = stream_count_views(views, profiler)
+        if view_counts is None:
+            input("按回车键退出...")
+            return
+        if not stats['valid']:
+            print("过滤后没有消息可分析")
+            input("按回车键退出...")
+            return
+    else:
+        # 1. 加载数据
+        with core.profile_stage(profiler, "load") as record:
+            messages = core.load_wechat_data(JSON_FILE)
+            record["items"] = len(messages)
+        if not messages:
+            print("没有可处理的消息")
+            input("按回车键退出...")
+            return
+        
+        # 2. 过滤消息（分析多个视角时先保留所有人的消息，统计词频时再按视角区分）
+        print(f"\n正在过滤消息 (分析对象: {', '.join(views)})...")
+        with core.profile_stage(profiler, "filter", len(messages)):
+            filtered_messages, stats = core.filter_messages(
+                messages, 
+                who=views[0] if len(views) == 1 else "all",
+                exclude_system=EXCLUDE_SYSTEM_MESSAGES
+            )
+        
+        if not filtered_messages:
+            print("过滤后没有消息可分析")
+            input("按回车键退出...")
+            return
+        
+        # 3. 清洗文本并分词，所有视角共用同一次分词结果
+        print("\n正在清洗文本和分词...")
+        view_counts = core.count_words_by_view(filtered_messages, views, REMOVE_REGEX, STOP_WORD_SET,
+                                               profiler=profiler, dedup=DEDUP_MESSAGES)
     
-    print(f"清洗后得到 {len(texts)} 条有效文本")
+    font_path = core.find_chinese_font()
     
-    # 4. 生成增强版词云
-    wordcloud, word_counts = generate_enhanced_wordcloud(
-        texts, 
-        max_words=MAX_WORDS,
-        background_color=BACKGROUND_COLOR
-    )
+    params_text = f"参数设置:\n"
+    params_text += f"字体大小: {FONT_SIZE_RANGE[0]}-{FONT_SIZE_RANGE[1]}\n"
+    params_text += f"词频指数: {FREQUENCY_EXPONENT}\n"
+    params_text += f"对数缩放: {USE_LOG_SCALE}\n"
+    params_text += f"相对缩放: {RELATIVE_SCALING}"
     
-    if not wordcloud:
-        print("生成词云失败")
+    outputs = []
+    for who in views:
+        view_name = core.VIEW_NAMES.get(who, who)
+        word_counts = view_counts[who]
+        if len(views) > 1:
+            print("\n" + "=" * 60)
+            print(f"分析对象: {view_name}")
+            print("=" * 60)
+        
+        # 4. 生成增强版词云
+        # 多个视角时阶段名后面加上视角，如 layout[me]
+        stage_suffix = f"[{who}]" if len(views) > 1 else ""
+        wordcloud = generate_enhanced_wordcloud(word_counts, font_path, profiler, stage_suffix)
+        
+        if not wordcloud:
+            print("生成词云失败")
+            continue
+        
+        # 5. 保存结果
+        output_image = get_output_path(OUTPUT_IMAGE, who, views)
+        output_stats = get_output_path(OUTPUT_STATS, who, views)
+        print("\n正在保存结果...")
+        with core.profile_stage(profiler, "save" + stage_suffix, len(word_counts)):
+            core.save_enhanced_results(wordcloud, word_counts, output_image, output_stats, EXPORT_PARQUET)
+        outputs.append((view_name, output_image, output_stats, wordcloud, word_counts))
+    
+    if not outputs:
         input("按回车键退出...")
         return
     
-    # 5. 保存和显示结果
-    print("\n正在保存结果...")
-    save_enhanced_results(wordcloud, word_counts)
+    # 显示窗口要等用户关闭，在显示之前保存性能报告
+    if profiler is not None:
+        profiler.messages = stats['total']
+        profiler.save_report(core.get_profile_path(OUTPUT_STATS))
     
-    print("\n正在显示词云图...")
-    display_enhanced_wordcloud(wordcloud, word_counts)
+    # 6. 显示词云
+    for view_name, _, _, wordcloud, word_counts in outputs:
+        print(f"\n正在显示词云图{f' ({view_name})' if len(views) > 1 else ''}...")
+        title = "微信聊天记录词云图（增强版）"
+        if len(views) > 1:
+            title += f" - {view_name}"
+        core.display_enhanced_wordcloud(wordcloud, word_counts, title, params_text)
     
     print("\n" + "=" * 60)
     print("处理完成！")
-    print(f"1. 词云图片: {OUTPUT_IMAGE}")
-    print(f"2. 词频统计: {OUTPUT_STATS}")
+    for view_name, output_image, output_stats, _, _ in outputs:
+        prefix = f"[{view_name}] " if len(views) > 1 else ""
+        print(f"{prefix}1. 词云图片: {output_image}")
+        print(f"{prefix}2. 词频统计: {output_stats}")
+    if profiler is not None:
+        print(f"3. 性能报告: {core.get_profile_path(OUTPUT_STATS)}")
     print("\n提示：可以调整以下参数获得不同效果：")
     print("  - 增大 FONT_SIZE_RANGE 的第一个值，让最小字更大")
     print("  - 增大 FONT_SIZE_RANGE 的第二个值，让最大字更大")
     print("  - 增大 FREQUENCY_EXPONENT (1.5-3.0)，增强词频差异")
     print("  - 调整 RELATIVE_SCALING (0.5-1.0)，控制缩放系数")
+    print("  - 把 ANALYZE_WHO 设为 [\"all\", \"me\", \"other\"]，一次生成三种词云")
     print("=" * 60)
     
     input("按回车键退出程序...")
@@ -0,0 +1,2063 @@
+"""
+微信聊天记录词云核心库
+读取、过滤、清洗、分词、统计词频和生成词云的公共函数，
+wechat_wordcloud2.0*.py 和 multi_chat_wordcloud.py 共用这里的实现
+"""
+
+import csv
+import json
+import marshal
+import re
+import os
+import sys
+import time
+import platform
+import datetime
+from array import array
+import math
+import heapq
+import random
+import hashlib
+import sqlite3
+import shutil
+import subprocess
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, partial
+from itertools import islice
+from operator import itemgetter
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+# jieba、numpy、matplotlib、wordcloud 导入很慢（合计约1秒），在用到它们的函数中才导入，
+# 只列出文件、没有找到聊天记录或只统计词频时不用等待这些库加载
+
+try:
+    import resource  # 只有Linux/macOS有这个模块
+except ImportError:
+    resource = None
+
+# ============================================
+# 第一部分：默认参数
+# ============================================
+
+STREAM_CHUNK_SIZE = 1024 * 1024  # 流式读取时每次读入的字符数
+PARALLEL_CHUNK_SIZE = 20000  # 分词时每批（每个任务）包含的文本条数
+TOKEN_CACHE_MAX_ENTRIES = 2000000  # 分词缓存最多保存的文本条数
+PARQUET_BATCH_SIZE = 100000  # 写 Parquet 时每批转换的行数
+PARQUET_COMPRESSION = "zstd"  # Parquet 文件的压缩方式
+# jieba分词词典（含自定义词语）的缓存文件夹，所有脚本和子进程共用；词典格式变化时增加版本号
+JIEBA_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".wechat_wordcloud_jieba")
+JIEBA_CACHE_VERSION = 1
+WORDCLOUD_RANDOM_SEED = 42  # 词云布局和配色的随机种子，相同的词频每次生成相同的图片
+NGRAM_MAX_N = 3  # 词组最多包含的词数（3=二元和三元词组）
+NGRAM_MAX_ENTRIES = 2000000  # 统计中的词组数超过此值时剪枝，删掉出现次数最少的词组
+NGRAM_MIN_COUNT = 5  # 出现次数少于此值的词组不输出
+
+# 重复消息的处理方式（None=不去重，逐条分词统计）
+DEDUP_MODES = {
+    "count": "相同文本只分词一次，词频乘以出现次数（结果与不去重相同）",
+    "collapse": "重复的文本只计一次（转发刷屏、机器人消息不再放大词频）",
+}
+
+# 判断两个导出文件中的消息是否为同一条时比较的字段（发送者、时间、类型和内容）
+MESSAGE_IDENTITY_FIELDS = ("createTime", "formattedTime", "isSend", "senderUsername", "senderDisplayName",
+                           "type", "content")
+
+# 可以分析的视角
+VIEW_NAMES = {
+    "all": "全部",
+    "me": "自己",
+    "other": "对方",
+}
+
+# 依次查找的中文字体（都不存在时再在系统字体中查找）
+POSSIBLE_FONTS = [
+    "C:/Windows/Fonts/simhei.ttf",
+    "C:/Windows/Fonts/msyh.ttc",
+    "C:/Windows/Fonts/simsun.ttc",
+    "simhei.ttf",
+    "/System/Library/Fonts/PingFang.ttc",
+    "/System/Library/Fonts/STHeiti Medium.ttc",
+]
+
+# 在系统字体中查找时，按文件名（小写，去掉空格、横线和下划线）依次匹配的中文字体
+CJK_FONT_NAME_HINTS = [
+    "simhei", "msyh", "notosanscjk", "notosanssc", "sourcehansans", "wqymicrohei", "wqyzenhei",
+    "droidsansfallback", "pingfang", "stheiti", "hiragino", "simsun", "notoserifcjk", "sourcehanserif",
+    "uming", "ukai",
+]
+
+# 系统字体的查找结果保存在用户目录下，所有脚本共用，以后运行时不用再扫描字体
+FONT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".wechat_wordcloud_font.json")
+
+# ============================================
+# 第二部分：读取聊天记录
+# ============================================
+
+class ChatFileStream:
+    """
+    聊天记录JSON文件的流式读取器
+    迭代时逐条产出 messages 数组中的消息，其余顶层字段（如 session）读到后存入 meta
+    内存占用只与单条消息和读取块大小有关，与文件大小无关
+    """
+
+    def __init__(self, file_path, chunk_size=STREAM_CHUNK_SIZE):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.meta = {}              # 除 messages 以外的顶层字段
+        self.has_messages = False   # 是否读到了 messages 字段
+        self.message_count = 0      # 已读取的消息数
+        self._decoder = json.JSONDecoder()
+        self._file = None
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self):
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            self._file = f
+            self._buf, self._pos, self._eof = '', 0, False
+            yield from self._parse_document()
+
+    def _fill(self):
+        """读入下一块数据，同时丢弃已解析的部分"""
+        if self._eof:
+            return False
+        chunk = self._file.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _error(self, message):
+        return json.JSONDecodeError(message, self._buf, self._pos)
+
+    def _next_char(self):
+        """跳过空白字符，返回下一个有效字符（不消耗）"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in ' \t\n\r':
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char):
+        if self._next_char() != char:
+            raise self._error(f"此处应为 '{char}'")
+        self._pos += 1
+
+    def _decode_value(self):
+        """解析一个完整的JSON值，数据不够时继续读入"""
+        self._next_char()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # 值恰好在缓冲区末尾结束时可能被截断（如数字），需读入更多再确认
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            if not self._fill():
+                self._eof = True
+
+    def _parse_document(self):
+        self._expect('{')
+        if self._next_char() == '}':
+            return
+
+        while True:
+            key = self._decode_value()
+            if not isinstance(key, str):
+                raise self._error("顶层字段名必须是字符串")
+            self._expect(':')
+
+            if key == 'messages':
+                self.has_messages = True
+                yield from self._parse_messages()
+            else:
+                self.meta[key] = self._decode_value()
+
+            char = self._next_char()
+            self._pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise self._error("顶层对象格式不正确")
+
+    def _parse_messages(self):
+        self._expect('[')
+        if self._next_char() == ']':
+            self._pos += 1
+            return
+
+        while True:
+            message = self._decode_value()
+            self.message_count += 1
+            yield message
+
+            char = self._next_char()
+            self._pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise self._error("messages 数组格式不正确")
+
+def read_chat_file(file_path):
+    """
+    读取并解析单个聊天记录文件，不输出任何信息，可以放在线程池或进程池中运行
+    返回 (消息列表, session, 耗时秒数)，没有 messages 字段时消息列表为 None
+    """
+    start = time.perf_counter()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    messages = data.get('messages')
+    return messages, data.get('session'), time.perf_counter() - start
+
+def iter_chat_files_concurrently(json_files, workers=4, use_processes=False, max_inflight_mb=1024):
+    """
+    并发读取和解析多个文件，按 json_files 的顺序产出 (文件路径, 结果)
+    结果为 read_chat_file 的返回值或读取时抛出的异常
+    use_processes: False=线程池（适合I/O慢的磁盘），True=进程池（JSON解析也能并行）
+    已提交但还没被取走的文件总大小不超过 max_inflight_mb（至少保留一个文件）
+    """
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    max_inflight = max_inflight_mb * 1024 * 1024
+
+    pending = deque()
+    inflight = 0
+    next_index = 0
+
+    with executor_class(max_workers=workers) as executor:
+        while next_index < len(json_files) or pending:
+            # 在并发数和内存上限内尽量多提交
+            while next_index < len(json_files) and len(pending) < workers:
+                file_path = json_files[next_index]
+                try:
+                    size = os.path.getsize(file_path)
+                except OSError as e:
+                    # 扫描之后被删除或无法访问的文件：按顺序作为这个文件的结果产出，不影响其他文件
+                    failed = Future()
+                    failed.set_exception(e)
+                    pending.append((file_path, 0, failed))
+                    next_index += 1
+                    continue
+                if pending and inflight + size > max_inflight:
+                    break
+                pending.append((file_path, size, executor.submit(read_chat_file, file_path)))
+                inflight += size
+                next_index += 1
+
+            # 按顺序取出最早提交的文件，保证结果顺序固定
+            file_path, size, future = pending.popleft()
+            try:
+                result = future.result()
+            except Exception as e:
+                result = e
+            inflight -= size
+            yield file_path, result
+
+def load_wechat_data(file_path):
+    """
+    读取单个微信聊天记录JSON文件，返回消息列表
+    """
+    print(f"正在读取文件: {file_path}")
+
+    try:
+        messages, session, elapsed = read_chat_file(file_path)
+
+        if messages is None:
+            print("错误：JSON文件中没有找到'messages'字段")
+            return []
+
+        print(f"成功读取 {len(messages)} 条消息 (耗时 {elapsed:.2f} 秒)")
+
+        if session is not None:
+            print(f"会话名称: {session.get('nickname', '未知')}")
+            print(f"消息总数: {session.get('messageCount', len(messages))}")
+
+        return messages
+
+    except Exception as e:
+        print(f"读取文件时发生错误: {e}")
+        return []
+
+class MessageIdentitySet:
+    """
+    记录已读取文件中每条消息的身份（MESSAGE_IDENTITY_FIELDS 的哈希），
+    合并同一聊天多次导出的文件时，跳过之前的文件中已经出现过的消息
+    只保存每条消息的 64 位哈希值，不保存消息本身；
+    同一个文件中完全相同的消息（如同一秒连发两次“哈哈”）都会保留
+    """
+
+    __slots__ = ('seen', 'skipped')
+
+    def __init__(self):
+        self.seen = set()
+        self.skipped = 0
+
+    @staticmethod
+    def message_key(msg):
+        values = tuple(map(msg.get, MESSAGE_IDENTITY_FIELDS))
+        try:
+            return hash(values)
+        except TypeError:
+            # 内容不是字符串等可哈希的值时（某些消息类型），用它的文本形式
+            return hash(repr(values))
+
+    def iter_new(self, messages):
+        """
+        逐条产出之前的文件中没有的消息（messages 是一个文件的全部消息）
+        本文件的消息在迭代结束后才加入记录，读取出错中断时已产出的消息同样加入
+        """
+        current = set()
+        try:
+            for msg in messages:
+                key = self.message_key(msg)
+                if key in self.seen:
+                    self.skipped += 1
+                    continue
+                current.add(key)
+                yield msg
+        finally:
+            self.seen |= current
+
+# ============================================
+# 第三部分：过滤和清洗
+# ============================================
+
+def sender_in_view(is_send, who):
+    """
+    判断消息是否属于某个视角："all"=全部, "me"=自己, "other"=对方
+    is_send 为消息的 isSend 字段（1=自己发送，0=对方发送）
+    """
+    if who == "all":
+        return True
+    if who == "me":
+        return is_send == 1
+    if who == "other":
+        return is_send == 0
+    return False
+
+def encode_is_send(is_send):
+    """
+    isSend 统一成 1=自己发送，0=对方发送，-1=未知
+    """
+    return 1 if is_send == 1 else 0 if is_send == 0 else -1
+
+class MessageColumns:
+    """
+    按列存放过滤后的消息：每个字段一个列表，第 i 条消息就是各列的第 i 个元素
+    几百万条消息时比每条消息一个字典省很多内存；
+    类型和发送者名字重复很多，用 sys.intern 只保留一份
+    """
+
+    __slots__ = ('contents', 'types', 'senders', 'is_send', 'times')
+
+    def __init__(self):
+        self.contents = []
+        self.types = []
+        self.senders = []
+        self.is_send = array('b')  # 1=自己发送，0=对方发送，-1=未知
+        self.times = []
+
+    def __len__(self):
+        return len(self.contents)
+
+    def append(self, content, msg_type, sender, is_send, msg_time):
+        self.contents.append(content)
+        self.types.append(sys.intern(msg_type) if isinstance(msg_type, str) else msg_type)
+        self.senders.append(sys.intern(sender) if isinstance(sender, str) else sender)
+        self.is_send.append(encode_is_send(is_send))
+        self.times.append(msg_time)
+
+    def rows(self):
+        """
+        逐条产出 (内容, 类型, 发送者, isSend, 时间) 元组，与 iter_filtered_messages 的格式相同
+        """
+        return zip(self.contents, self.types, self.senders, self.is_send, self.times)
+
+def new_message_stats():
+    """
+    空的消息统计
+    """
+    return {
+        'total': 0,
+        'text': 0,
+        'system': 0,
+        'me': 0,
+        'other': 0,
+        'valid': 0,
+        'other_names': set()
+    }
+
+def iter_filtered_messages(messages, who="all", exclude_system=True, stats=None):
+    """
+    逐条过滤消息，产出 (内容, 类型, 发送者, isSend, 时间) 元组，不保存任何消息
+    统计信息随着迭代累加到 stats 中，迭代结束后才是完整的
+    """
+    if stats is None:
+        stats = new_message_stats()
+
+    for msg in messages:
+        stats['total'] += 1
+        msg_type = msg.get('type', '')
+        content = msg.get('content', '')
+
+        if not content or not isinstance(content, str):
+            continue
+
+        # 统计系统消息
+        if msg_type == "系统消息":
+            stats['system'] += 1
+            if exclude_system:
+                continue
+        else:
+            stats['text'] += 1
+
+        # 获取发送者信息
+        is_send = msg.get('isSend')
+        sender_name = msg.get('senderDisplayName', '')
+
+        # 统计发送者
+        if is_send == 1:
+            stats['me'] += 1
+        elif is_send == 0 and sender_name:
+            stats['other'] += 1
+            stats['other_names'].add(sender_name)
+
+        # 根据发送者过滤
+        if not sender_in_view(is_send, who):
+            continue
+
+        stats['valid'] += 1
+        yield content, msg_type, sender_name, is_send, msg.get('formattedTime', '')
+
+def print_message_stats(stats):
+    """
+    打印消息统计
+    """
+    print(f"\n消息统计:")
+    print(f"  总消息数: {stats['total']}")
+    print(f"  文本消息: {stats['text']}")
+    print(f"  系统消息: {stats['system']}")
+    print(f"  我发送的: {stats['me']}")
+    print(f"  对方发送: {stats['other']}")
+    if stats['other_names']:
+        print(f"  聊天对象: {', '.join(stats['other_names'])}")
+
+    print(f"过滤后得到 {stats['valid']} 条有效消息")
+
+def filter_messages(messages, who="all", exclude_system=True):
+    """
+    过滤消息，返回 (MessageColumns, 统计信息)
+    messages 可以是列表，也可以是流式读取产生的迭代器
+    """
+    filtered = MessageColumns()
+    stats = new_message_stats()
+
+    for row in iter_filtered_messages(messages, who, exclude_system, stats):
+        filtered.append(*row)
+
+    print_message_stats(stats)
+    return filtered, stats
+
+def compile_remove_patterns(patterns):
+    """
+    预编译排除模式，返回 (合并的正则, 各个模式的正则)
+    合并的正则只用来判断文本中有没有要移除的内容（大多数消息没有，只需扫描一遍）；
+    有的话仍按顺序逐个替换，几个模式的匹配有重叠时结果与逐个 re.sub 相同
+    """
+    combined = re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+    return combined, tuple(re.compile(pattern) for pattern in patterns)
+
+WHITESPACE_REGEX = re.compile(r'\s+')
+
+def clean_text(text, remove_regex):
+    """
+    清洗文本：按顺序移除排除模式匹配的内容，再合并多余的空白字符
+    remove_regex: compile_remove_patterns 的结果
+    """
+    if not isinstance(text, str):
+        return ""
+
+    combined, regexes = remove_regex
+    cleaned = text
+    if combined.search(text) is not None:
+        for regex in regexes:
+            cleaned = regex.sub('', cleaned)
+
+    # 移除多余空白字符
+    cleaned = WHITESPACE_REGEX.sub(' ', cleaned).strip()
+
+    return cleaned
+
+# ============================================
+# 第四部分：分词和词频统计
+# ============================================
+
+# 至少包含一个常用汉字的词才计入词频
+CJK_REGEX = re.compile(r'[\u4e00-\u9fa5]')
+
+def load_stop_words(path):
+    """
+    读取停用词文件：每行一个词，# 开头的行是注释
+    """
+    stop_words = set()
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            word = line.strip()
+            if word and not word.startswith('#'):
+                stop_words.add(word)
+    return stop_words
+
+def build_stop_words(stop_words, stop_word_files=()):
+    """
+    合并脚本中的停用词和停用词文件，返回 frozenset（判断是否停用词只需一次哈希查找）
+    读取失败的文件只打印警告
+    """
+    words = set(stop_words)
+    for path in stop_word_files:
+        try:
+            file_words = load_stop_words(path)
+        except OSError as e:
+            print(f"警告：无法读取停用词文件 {path} - {e}")
+            continue
+        print(f"从 {path} 读取了 {len(file_words)} 个停用词")
+        words |= file_words
+    return frozenset(words)
+
+# init_jieba 加入词典的自定义词语（排序后的元组），进程池的子进程用它初始化同样的词典
+jieba_custom_words = ()
+
+def get_jieba_dictionary_key(custom_words=None):
+    """
+    分词词典的标识：jieba版本、词典文件和自定义词语都相同时标识相同，
+    用于缓存文件名和分词缓存的版本（词典变化后旧的分词结果作废）
+    custom_words: None=当前已加入的自定义词语
+    """
+    import jieba
+
+    if custom_words is None:
+        custom_words = jieba_custom_words
+    dictionary = jieba.dt.dictionary or os.path.join(os.path.dirname(jieba.__file__), jieba.DEFAULT_DICT_NAME)
+    try:
+        info = os.stat(dictionary)
+        dictionary_version = f"{info.st_size}-{info.st_mtime_ns}"
+    except OSError:
+        dictionary_version = "missing"
+    key = "\n".join([str(JIEBA_CACHE_VERSION), jieba.__version__, os.path.abspath(dictionary),
+                     dictionary_version, *custom_words])
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+def load_jieba_cache(cache_path):
+    """
+    读取缓存的前缀词典，返回 (词频表, 总词频)，没有缓存或缓存损坏时返回 None
+    整个文件一次读入内存再解析，比jieba自带缓存的 marshal.load(文件) 逐块读取快得多
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+        freq, total = marshal.loads(data)
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+    if not isinstance(freq, dict) or not freq:
+        return None
+    return freq, total
+
+def save_jieba_cache(cache_path, freq, total):
+    """
+    保存前缀词典（先写临时文件再替换，多个进程同时写也不会读到半个文件）
+    """
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            marshal.dump((freq, total), f)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"无法保存分词词典缓存 {cache_path}: {e}")
+
+def get_dictionary_words(custom_words, stop_words=()):
+    """
+    要加入分词词典的词语：自定义词语和多字停用词
+    （停用词作为一个整体切出来再被过滤，不会被拆成几个词留在词云里）
+    """
+    return [word for word in custom_words if word] + [word for word in stop_words if len(word) > 1]
+
+def init_jieba(custom_words=(), cache_dir=JIEBA_CACHE_DIR):
+    """
+    初始化jieba分词词典，并加入自定义词语（人名、常用语、多字停用词等，分词时保持完整）
+    建好的词典按 get_jieba_dictionary_key 保存在缓存文件夹中，以后的运行、其他脚本和
+    进程池的子进程都直接读取缓存，不用再建词典和逐个加词
+    已经用相同的词语初始化过时直接返回；返回耗时（秒）
+    """
+    global jieba_custom_words
+    start = time.perf_counter()
+    import jieba
+
+    words = tuple(sorted({word.strip() for word in custom_words if word and word.strip()}))
+    key = get_jieba_dictionary_key(words)
+    if jieba.dt.initialized and words == jieba_custom_words:
+        return 0.0
+
+    cache_path = os.path.join(cache_dir, f"jieba_v{JIEBA_CACHE_VERSION}_{key}.cache") if cache_dir else None
+    cached = load_jieba_cache(cache_path) if cache_path else None
+    with jieba.dt.lock:
+        if cached is not None:
+            jieba.dt.FREQ, jieba.dt.total = cached
+            jieba.dt.initialized = True
+
+    if cached is None:
+        # 重新建词典：已经加过其他自定义词语时先恢复成jieba自带的词典
+        jieba.dt.initialized = False
+        jieba.dt.initialize()
+        # 词典中已有的词不再加入（add_word 会改变它们的词频，影响其他文本的分词结果）
+        for word in words:
+            if not jieba.dt.FREQ.get(word):
+                jieba.add_word(word)
+        if cache_path:
+            save_jieba_cache(cache_path, jieba.dt.FREQ, jieba.dt.total)
+
+    jieba_custom_words = words
+    return time.perf_counter() - start
+
+def is_valid_word(word, stop_words):
+    """
+    判断分词结果是否计入词频（过滤停用词、单字、数字和非中文词）
+    stop_words 最好是 set/frozenset
+    """
+    # 纯数字不含汉字，由汉字检查一并排除
+    return (len(word) > 1 and
+            word not in stop_words and
+            CJK_REGEX.search(word) is not None)
+
+def filter_word_counts(raw_counts, stop_words):
+    """
+    从分词结果的原始计数中去掉无效词（停用词、单字、数字、非中文词和空白）
+    先用 Counter 统计全部词语再过滤，每个不同的词只判断一次；
+    结果（包括词语的先后顺序）与逐个词判断后计数完全相同
+    """
+    word_counts = Counter()
+    for word, count in raw_counts.items():
+        word = word.strip()
+        if is_valid_word(word, stop_words):
+            word_counts[word] += count
+    return word_counts
+
+def count_words(texts, stop_words, profiler=None, ngrams=None):
+    """
+    对一组文本分词并统计有效词语的词频
+    profiler: PipelineProfiler，分别记录分词和统计两个阶段
+    ngrams: NgramCounter，不为 None 时在统计词频的同时统计词组
+    """
+    import jieba
+
+    if ngrams is not None:
+        # 词组不能跨过两条文本，需要每条文本的分词结果（与分词缓存中保存的相同）
+        with profile_stage(profiler, "segment", len(texts)):
+            token_lists = tokenize_texts(texts)
+
+        with profile_stage(profiler, "count", len(token_lists)):
+            raw_counts = Counter()
+            for tokens in token_lists:
+                raw_counts.update(tokens)
+                ngrams.add(tokens)
+            return filter_word_counts(raw_counts, stop_words)
+
+    # 文本之间用空格连接，空格会把jieba的分词块隔开，结果与逐条分词相同
+    with profile_stage(profiler, "segment", len(texts)):
+        words = jieba.lcut(' '.join(texts))
+
+    with profile_stage(profiler, "count", len(words)):
+        word_counts = filter_word_counts(Counter(words), stop_words)
+
+    return word_counts
+
+def count_words_parallel(texts, stop_words, workers=None, chunk_size=PARALLEL_CHUNK_SIZE):
+    """
+    多进程分词：把文本分成若干块交给进程池，再按顺序合并各块的词频
+    合并顺序与文本顺序一致，结果（包括同频词的先后顺序）与 count_words 完全相同
+    """
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+
+    word_counts = Counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_jieba,
+                             initargs=(jieba_custom_words,)) as executor:
+        for chunk_counts in executor.map(partial(count_words, stop_words=stop_words), chunks):
+            word_counts.update(chunk_counts)
+
+    return word_counts
+
+def tokenize_texts(texts):
+    """
+    分词，返回每条文本去掉空白后的词语列表
+    """
+    # jieba把每个换行符单独切成一个词，用换行符连接所有文本只需调用一次jieba，
+    # 再按换行符切回每条文本，结果与逐条分词相同
+    if not texts:
+        return []
+    import jieba
+    words = jieba.lcut('\n'.join(text.replace('\n', ' ') for text in texts))
+
+    token_lists = [[]]
+    for word in words:
+        if word == '\n':
+            token_lists.append([])
+            continue
+        word = word.strip()
+        if word:
+            token_lists[-1].append(word)
+    return token_lists
+
+class TokenCache:
+    """
+    持久化的分词缓存（sqlite）
+    以清洗后文本的哈希为键，保存jieba的分词结果（未过滤停用词，修改停用词后缓存仍然有效）
+    运行中数据库出错（损坏、被其他程序锁定等）时停用缓存，之后的文本照常分词，不中断统计
+    """
+
+    # jieba版本、词典或自定义词语变化后分词结果可能不同，缓存需要作废
+    VERSION = "1"
+    QUERY_BATCH = 500  # 每条SQL查询的键数量，不超过sqlite的参数个数限制
+
+    def __init__(self, path, max_entries=TOKEN_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        try:
+            self.open()
+        except sqlite3.Error:
+            self.conn.close()
+            raise
+
+    def open(self):
+        """
+        建表，检查缓存版本，开始新一次运行
+        """
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS tokens ("
+                          "key BLOB PRIMARY KEY, tokens TEXT NOT NULL, used INTEGER NOT NULL"
+                          ") WITHOUT ROWID")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS tokens_used ON tokens (used)")
+
+        # 缓存版本包含分词词典的标识，加入不同的自定义词语后旧的分词结果不再使用
+        import jieba
+        self.version = f"{self.VERSION}-jieba-{jieba.__version__}-{get_jieba_dictionary_key()}"
+        meta = dict(self.conn.execute("SELECT name, value FROM meta"))
+        if meta.get('version') != self.version:
+            self.conn.execute("DELETE FROM tokens")
+            meta = {}
+        # 每次运行的编号，用于记录条目最近一次被使用的时间
+        self.generation = int(meta.get('generation', 0)) + 1
+        self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                              [('version', self.version), ('generation', str(self.generation))])
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(text):
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+    def disable(self, error):
+        """
+        停用缓存：关闭数据库，之后查询都不命中、写入都忽略
+        """
+        print(f"警告：分词缓存 {self.path} 出错 - {error}，不再使用缓存")
+        try:
+            self.conn.close()
+        except sqlite3.Error:
+            pass
+        self.conn = None
+
+    def get_many(self, keys):
+        """
+        批量查询，返回 {键: 词语列表}，并把命中的条目标记为本次使用过
+        """
+        keys = list(set(keys))
+        found = {}
+        if self.conn is not None:
+            try:
+                for i in range(0, len(keys), self.QUERY_BATCH):
+                    batch = keys[i:i + self.QUERY_BATCH]
+                    placeholders = ','.join('?' * len(batch))
+                    rows = self.conn.execute(
+                        f"SELECT key, tokens FROM tokens WHERE key IN ({placeholders})", batch)
+                    for key, tokens in rows:
+                        found[key] = tokens.split('\n') if tokens else []
+
+                self.conn.executemany("UPDATE tokens SET used = ? WHERE key = ?",
+                                      [(self.generation, key) for key in found])
+            except sqlite3.Error as e:
+                self.disable(e)
+                found = {}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries):
+        """
+        批量写入 {键: 词语列表}
+        """
+        if self.conn is None:
+            return
+        try:
+            self.conn.executemany("INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)",
+                                  [(key, '\n'.join(tokens), self.generation)
+                                   for key, tokens in entries.items()])
+        except sqlite3.Error as e:
+            self.disable(e)
+
+    def close(self):
+        """
+        淘汰超出容量的旧条目并保存
+        """
+        if self.conn is None:
+            return
+        try:
+            count = self.conn.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute("DELETE FROM tokens WHERE key IN "
+                                  "(SELECT key FROM tokens ORDER BY used LIMIT ?)",
+                                  (count - self.max_entries,))
+            self.conn.commit()
+            self.conn.close()
+        except sqlite3.Error as e:
+            self.disable(e)
+            return
+        self.conn = None
+
+def iter_batches(items, batch_size):
+    """
+    把列表或迭代器按 batch_size 条一批切开，迭代器不会被一次读完
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def iter_token_lists(texts, cache_path=None, workers=1, batch_size=PARALLEL_CHUNK_SIZE,
+                     cache_max_entries=TOKEN_CACHE_MAX_ENTRIES):
+    """
+    按顺序产出每条文本的词语列表
+    texts 可以是列表，也可以是迭代器：每次只取 batch_size 条分词，内存占用与文本总数无关
+    cache_path: 分词缓存文件，只对缓存中没有的文本分词；None=不使用缓存
+    workers: 分词进程数，1=单进程，None=使用全部CPU核心
+    """
+    cache = None
+    if cache_path:
+        try:
+            cache = TokenCache(cache_path, max_entries=cache_max_entries)
+        except sqlite3.Error as e:
+            print(f"警告：无法打开分词缓存 {cache_path} - {e}，不使用缓存")
+
+    executor = None
+    try:
+        for batch in iter_batches(texts, batch_size):
+
+            if cache is not None:
+                keys = [TokenCache.make_key(text) for text in batch]
+                token_lists = cache.get_many(keys)
+            else:
+                keys = batch
+                token_lists = {}
+
+            # 只对缓存中没有的文本分词
+            missing = {}
+            for key, text in zip(keys, batch):
+                if key not in token_lists:
+                    missing[key] = text
+
+            if missing:
+                missing_texts = list(missing.values())
+                if workers != 1 and len(missing_texts) > 1000:
+                    if executor is None:
+                        # 子进程使用与当前进程相同的词典（从词典缓存读取）
+                        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_jieba,
+                                                       initargs=(jieba_custom_words,))
+                    step = -(-len(missing_texts) // (workers or os.cpu_count()))
+                    chunks = [missing_texts[i:i + step] for i in range(0, len(missing_texts), step)]
+                    new_token_lists = [tokens for part in executor.map(tokenize_texts, chunks)
+                                       for tokens in part]
+                else:
+                    new_token_lists = tokenize_texts(missing_texts)
+
+                new_entries = dict(zip(missing.keys(), new_token_lists))
+                if cache is not None:
+                    cache.put_many(new_entries)
+                token_lists.update(new_entries)
+
+            for key in keys:
+                yield token_lists[key]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if cache is not None:
+            cache.close()
+            print(f"分词缓存: 命中 {cache.hits} 条，新分词 {cache.misses} 条 ({cache_path})")
+
+def count_words_cached(texts, stop_words, cache_path, workers=1, batch_size=PARALLEL_CHUNK_SIZE,
+                       cache_max_entries=TOKEN_CACHE_MAX_ENTRIES, ngrams=None):
+    """
+    使用分词缓存统计词频：只对缓存中没有的文本分词，结果与 count_words 相同
+    cache_path 为 None 时不使用缓存；texts 为迭代器时边读边统计，不保存文本列表
+    ngrams: NgramCounter，不为 None 时同时统计词组
+    """
+    raw_counts = Counter()
+    for tokens in iter_token_lists(texts, cache_path, workers, batch_size, cache_max_entries):
+        raw_counts.update(tokens)
+        if ngrams is not None:
+            ngrams.add(tokens)
+    return filter_word_counts(raw_counts, stop_words)
+
+def add_repeated_tokens(counts, tokens, times):
+    """
+    把一条文本的词语累加 times 次（词语的先后顺序与逐次累加相同）
+    """
+    if times == 1:
+        counts.update(tokens)
+    else:
+        for word, count in Counter(tokens).items():
+            counts[word] += count * times
+
+def print_dedup_stats(text_count, unique_count, dedup):
+    duplicates = text_count - unique_count
+    ratio = duplicates / text_count if text_count else 0
+    print(f"去重: {text_count} 条文本中有 {unique_count} 条不同文本，重复 {duplicates} 条 ({ratio:.1%})"
+          f"{'，重复的只计一次' if dedup == 'collapse' else ''}")
+
+def count_words_deduplicated(texts, stop_words, dedup="count", cache_path=None, workers=1,
+                             batch_size=PARALLEL_CHUNK_SIZE, cache_max_entries=TOKEN_CACHE_MAX_ENTRIES,
+                             profiler=None, ngrams=None):
+    """
+    先按清洗后的文本计数，每条不同的文本只分词一次
+    dedup: "count"=词频乘以出现次数，结果（包括词语的先后顺序）与 count_words 相同；
+           "collapse"=重复的文本只计一次
+    profiler: PipelineProfiler，记录去重（dedup）和分词统计（segment_count）两个阶段
+    ngrams: NgramCounter，不为 None 时同时统计词组（同样乘以出现次数）
+    """
+    # 文本本身作为键（字典按哈希查找），保持第一次出现的先后顺序
+    with profile_stage(profiler, "dedup", len(texts)):
+        occurrences = Counter(texts)
+    print_dedup_stats(len(texts), len(occurrences), dedup)
+
+    raw_counts = Counter()
+    with profile_stage(profiler, "segment_count", len(occurrences)):
+        token_stream = iter_token_lists(occurrences, cache_path, workers, batch_size, cache_max_entries)
+        for tokens, times in zip(token_stream, occurrences.values()):
+            times = 1 if dedup == "collapse" else times
+            add_repeated_tokens(raw_counts, tokens, times)
+            if ngrams is not None:
+                ngrams.add(tokens, times)
+    return filter_word_counts(raw_counts, stop_words)
+
+def update_group_counts(group_counts, token_stream, text_groups, stop_words, ngrams=None):
+    """
+    把每条文本的词语累加到它所属的各组（视角或时间段）的词频中
+    text_groups: 与 token_stream 一一对应，每条文本所属的组；group_counts 中没有的组会自动添加
+    ngrams: NgramCounter，不为 None 时同时统计全部文本的词组（不分组）
+    """
+    raw_counts = {}
+    for tokens, groups in zip(token_stream, text_groups):
+        if ngrams is not None:
+            ngrams.add(tokens)
+        for key in groups:
+            counts = raw_counts.get(key)
+            if counts is None:
+                counts = raw_counts[key] = Counter()
+            counts.update(tokens)
+
+    for key, counts in raw_counts.items():
+        group_counts.setdefault(key, Counter()).update(filter_word_counts(counts, stop_words))
+
+def count_grouped_texts(items, remove_regex, stop_words, cache_path=None, workers=1,
+                        batch_size=PARALLEL_CHUNK_SIZE, cache_max_entries=TOKEN_CACHE_MAX_ENTRIES,
+                        group_counts=None, ngrams=None):
+    """
+    流式清洗、分词并按组统计词频
+    items: (内容, 所属的组) 的迭代器，所属的组为空时跳过这条消息
+    清洗后的文本边产出边分词，所属的组暂存在队列里，最多只有一批
+    返回 ({组: 词频}, 有效文本数)
+    """
+    if group_counts is None:
+        group_counts = {}
+    pending_groups = deque()
+    progress = {'texts': 0}
+
+    def iter_texts():
+        for content, groups in items:
+            if not groups:
+                continue
+            cleaned = clean_text(content, remove_regex)
+            if cleaned:
+                progress['texts'] += 1
+                pending_groups.append(groups)
+                yield cleaned
+
+    token_stream = iter_token_lists(iter_texts(), cache_path, workers, batch_size, cache_max_entries)
+    update_group_counts(group_counts, token_stream, iter(pending_groups.popleft, None), stop_words, ngrams)
+    return group_counts, progress['texts']
+
+def count_words_by_view(messages, views, remove_regex, stop_words, cache_path=None, workers=1,
+                        batch_size=PARALLEL_CHUNK_SIZE, cache_max_entries=TOKEN_CACHE_MAX_ENTRIES,
+                        profiler=None, dedup=None):
+    """
+    只清洗和分词一次，同时统计多个视角（all/me/other）的词频
+    messages: filter_messages(who="all") 过滤后的 MessageColumns，
+              或 iter_filtered_messages(who="all") 的迭代器（流式统计，内存占用只与词汇量有关）
+    返回 {视角: 词频}，每个视角的结果与单独按该视角过滤后统计的结果相同
+    profiler: PipelineProfiler，记录清洗（clean）和分词统计（segment_count）两个阶段；
+              流式统计时读取到统计都是交替进行的，记录为一个阶段（stream_count）
+    dedup: None 或 DEDUP_MODES 中的一种，见 count_words_deduplicated；
+           流式统计时不去重（需要记住所有不同的文本，内存占用不再与消息数无关）
+    """
+    # isSend 只有三种取值，提前算好每种取值属于哪些视角
+    view_targets = {is_send: [who for who in views if sender_in_view(is_send, who)]
+                    for is_send in (1, 0, -1)}
+    view_counts = {who: Counter() for who in views}
+
+    if not isinstance(messages, MessageColumns):
+        items = ((content, view_targets[encode_is_send(is_send)])
+                 for content, _, _, is_send, _ in messages)
+        with profile_stage(profiler, "stream_count") as record:
+            _, text_count = count_grouped_texts(items, remove_regex, stop_words, cache_path, workers,
+                                                batch_size, cache_max_entries, group_counts=view_counts)
+            record["items"] = text_count
+
+        print(f"清洗后得到 {text_count} 条有效文本")
+        return view_counts
+
+    texts = []
+    text_is_send = array('b')
+    with profile_stage(profiler, "clean", len(messages)):
+        for content, is_send in zip(messages.contents, messages.is_send):
+            if not view_targets[is_send]:
+                continue
+            cleaned = clean_text(content, remove_regex)
+            if cleaned:
+                texts.append(cleaned)
+                text_is_send.append(is_send)
+
+    print(f"清洗后得到 {len(texts)} 条有效文本")
+
+    if dedup:
+        # 按 (文本, isSend) 计数，同一文本在各视角中分别乘以出现次数（或只计一次）
+        with profile_stage(profiler, "dedup", len(texts)):
+            occurrences = Counter(zip(texts, text_is_send))
+        print_dedup_stats(len(texts), len({text for text, _ in occurrences}), dedup)
+
+        raw_counts = {who: Counter() for who in views}
+        counted = set()  # collapse 时已经计入各视角的文本（自己和对方发过同样的文本，"all" 中只计一次）
+        with profile_stage(profiler, "segment_count", len(occurrences)):
+            # 同一文本由自己和对方都发过的情况很少，各分一次词
+            token_stream = iter_token_lists((text for text, _ in occurrences), cache_path, workers,
+                                            batch_size, cache_max_entries)
+            for tokens, ((text, is_send), times) in zip(token_stream, occurrences.items()):
+                for who in view_targets[is_send]:
+                    if dedup == "collapse":
+                        if (who, text) in counted:
+                            continue
+                        counted.add((who, text))
+                        times = 1
+                    add_repeated_tokens(raw_counts[who], tokens, times)
+            for who, counts in raw_counts.items():
+                view_counts[who].update(filter_word_counts(counts, stop_words))
+        return view_counts
+
+    # 分词结果是按批产出的，分词和统计交替进行，合并记录为一个阶段
+    with profile_stage(profiler, "segment_count", len(texts)):
+        token_stream = iter_token_lists(texts, cache_path, workers, batch_size, cache_max_entries)
+        text_groups = (view_targets[is_send] for is_send in text_is_send)
+        update_group_counts(view_counts, token_stream, text_groups, stop_words)
+
+    return view_counts
+
+# 按时间分组的方式
+TIME_BUCKET_NAMES = {
+    "year": "年",
+    "month": "月",
+    "week": "周",
+    "day": "天",
+}
+UNKNOWN_TIME_BUCKET = "unknown"  # 没有时间或时间格式无法识别的消息
+
+def make_time_bucket_function(period):
+    """
+    返回把 formattedTime（如 "2024-01-05 12:30:00"）转换成时间段名称的函数
+    year -> "2024"，month -> "2024-01"，week -> "2024-W01"（ISO周），day -> "2024-01-05"
+    同一天的消息很多，按日期缓存计算结果
+    """
+    if period not in TIME_BUCKET_NAMES:
+        raise ValueError(f"不支持的时间分组方式: {period}（可选: {', '.join(TIME_BUCKET_NAMES)}）")
+
+    cache = {}
+
+    def bucket_of(formatted_time):
+        date = formatted_time[:10] if isinstance(formatted_time, str) else ''
+        bucket = cache.get(date)
+        if bucket is None:
+            try:
+                day = datetime.date.fromisoformat(date)
+            except ValueError:
+                bucket = UNKNOWN_TIME_BUCKET
+            else:
+                if period == "year":
+                    bucket = f"{day.year:04d}"
+                elif period == "month":
+                    bucket = f"{day.year:04d}-{day.month:02d}"
+                elif period == "week":
+                    iso_year, iso_week, _ = day.isocalendar()
+                    bucket = f"{iso_year:04d}-W{iso_week:02d}"
+                else:
+                    bucket = day.isoformat()
+            cache[date] = bucket
+        return bucket
+
+    return bucket_of
+
+class SenderWordMatrix:
+    """
+    发送者 × 词语 的稀疏词频矩阵
+    每个发送者一行，只保存这个人用过的词（词语编号 -> 次数），几百人的群聊也只占很少内存
+    发送者按消息数从多到少排列
+    """
+
+    __slots__ = ('senders', 'words', 'rows', 'message_counts', 'sender_index', 'word_index')
+
+    def __init__(self):
+        self.senders = []         # 行：发送者名字
+        self.words = []           # 列：词语
+        self.rows = []            # 每行一个 {词语编号: 次数}，按词语第一次出现的顺序
+        self.message_counts = []  # 每个发送者的消息数
+        self.sender_index = {}
+        self.word_index = {}
+
+    def __len__(self):
+        return len(self.senders)
+
+    @property
+    def nnz(self):
+        """
+        非零元素个数
+        """
+        return sum(len(row) for row in self.rows)
+
+    def add_row(self, sender, word_counts, message_count=0):
+        """
+        添加一个发送者的词频
+        """
+        row = {}
+        for word, count in word_counts.items():
+            word_id = self.word_index.get(word)
+            if word_id is None:
+                word_id = self.word_index[word] = len(self.words)
+                self.words.append(word)
+            row[word_id] = count
+
+        self.sender_index[sender] = len(self.senders)
+        self.senders.append(sender)
+        self.rows.append(row)
+        self.message_counts.append(message_count)
+
+    def sender_counts(self, sender):
+        """
+        某个发送者的词频（Counter）
+        """
+        words = self.words
+        return Counter({words[word_id]: count
+                        for word_id, count in self.rows[self.sender_index[sender]].items()})
+
+    def iter_entries(self):
+        """
+        逐个产出 (发送者, 词语, 次数)，每个发送者的词按次数从多到少排列
+        """
+        words = self.words
+        for sender, row in zip(self.senders, self.rows):
+            for word_id, count in sorted(row.items(), key=itemgetter(1), reverse=True):
+                yield sender, words[word_id], count
+
+def sender_key(sender, is_send):
+    """
+    发送者的名字，没有名字时自己发送的记为"我"
+    """
+    if sender:
+        return sender
+    return "我" if is_send == 1 else "未知"
+
+def count_words_by_group(messages, remove_regex, stop_words, period=None, by_sender=False,
+                         cache_path=None, workers=1, batch_size=PARALLEL_CHUNK_SIZE,
+                         cache_max_entries=TOKEN_CACHE_MAX_ENTRIES, profiler=None, ngrams=None):
+    """
+    只清洗和分词一次，同时统计全部消息、每个时间段和每个发送者的词频
+    messages: 过滤后的 MessageColumns，或 iter_filtered_messages 的迭代器
+    period: None=不分时间段，year / month / week / day
+    by_sender: 是否统计每个发送者的词频
+    ngrams: NgramCounter，不为 None 时同时统计全部消息的词组
+    返回 (全部词频, {时间段: 词频} 或 None, SenderWordMatrix 或 None)；
+    时间段按时间先后排列，无法识别时间的消息放在最后；全部词频与不分组统计的结果相同
+    """
+    bucket_of = make_time_bucket_function(period) if period else None
+    total_key = object()  # 不会与任何时间段或发送者重名
+    sender_messages = Counter()
+
+    if isinstance(messages, MessageColumns):
+        rows = zip(messages.contents, messages.senders, messages.is_send, messages.times)
+    else:
+        rows = ((content, sender, is_send, msg_time)
+                for content, _, sender, is_send, msg_time in messages)
+
+    def iter_items():
+        for content, sender, is_send, msg_time in rows:
+            groups = [total_key]
+            if bucket_of is not None:
+                groups.append(("time", bucket_of(msg_time)))
+            if by_sender:
+                name = sender_key(sender, is_send)
+                sender_messages[name] += 1
+                groups.append(("sender", name))
+            yield content, groups
+
+    with profile_stage(profiler, "group_count") as record:
+        group_counts, text_count = count_grouped_texts(iter_items(), remove_regex, stop_words, cache_path,
+                                                       workers, batch_size, cache_max_entries, ngrams=ngrams)
+        record["items"] = text_count
+
+    word_counts = group_counts.pop(total_key, Counter())
+    print(f"清洗后得到 {text_count} 条有效文本")
+
+    bucket_counts = None
+    if bucket_of is not None:
+        buckets = sorted((key[1] for key in group_counts if key[0] == "time"),
+                         key=lambda bucket: (bucket == UNKNOWN_TIME_BUCKET, bucket))
+        bucket_counts = {bucket: group_counts[("time", bucket)] for bucket in buckets}
+        print(f"  分为 {len(bucket_counts)} 个时间段")
+
+    sender_matrix = None
+    if by_sender:
+        sender_matrix = SenderWordMatrix()
+        for name, message_count in sorted(sender_messages.items(), key=lambda item: (-item[1], item[0])):
+            sender_matrix.add_row(name, group_counts.get(("sender", name), Counter()), message_count)
+        print(f"  共 {len(sender_matrix)} 个发送者，{len(sender_matrix.words)} 个不同词语，"
+              f"矩阵非零元素 {sender_matrix.nnz} 个")
+
+    return word_counts, bucket_counts, sender_matrix
+
+class NgramCounter:
+    """
+    与词频统计同一遍流式统计词组：同一条文本中连续出现的有效词语组成的二元、三元词组（如“项目 上线”）
+    停用词、标点、单字等无效词语会把词组断开（分词结果已去掉空白，空格不断开）；
+    词语映射为整数编号，词组用编号元组作键
+    词组数超过 max_entries 时剪枝，保留出现次数最多的一半，被删掉的词组以后再出现时重新计数
+    （所以剪枝后的次数可能偏少，是实际次数的下限，最多少算 count_error 次）
+    """
+
+    __slots__ = ('stop_words', 'max_n', 'max_entries', 'token_ids', 'words', 'word_counts',
+                 'ngram_counts', 'total_words', 'count_error', 'pruned')
+
+    def __init__(self, stop_words, max_n=NGRAM_MAX_N, max_entries=NGRAM_MAX_ENTRIES):
+        self.stop_words = stop_words
+        self.max_n = max_n
+        self.max_entries = max_entries
+        self.token_ids = {}    # 分词结果 -> 词语编号，无效词语为 -1（每种写法只判断一次）
+        self.words = []        # 编号 -> 词语
+        self.word_counts = []  # 编号 -> 出现次数（与词频统计的结果相同）
+        self.ngram_counts = {}  # (编号, ...) -> 出现次数，按第一次出现的顺序
+        self.total_words = 0
+        self.count_error = 0   # 每次剪枝删掉的最大出现次数之和：任何词组的次数最多少算这么多
+        self.pruned = 0        # 剪枝删掉的词组数
+
+    def __len__(self):
+        return len(self.ngram_counts)
+
+    def token_id(self, token):
+        """
+        分词结果对应的词语编号，第一次出现的有效词语分配新编号
+        """
+        word = token.strip()
+        if not is_valid_word(word, self.stop_words):
+            word_id = -1
+        else:
+            # 前后带空格的写法与去掉空格的词语共用一个编号
+            word_id = self.token_ids.get(word)
+            if word_id is None:
+                word_id = self.token_ids[word] = len(self.words)
+                self.words.append(word)
+                self.word_counts.append(0)
+        self.token_ids[token] = word_id
+        return word_id
+
+    def add(self, tokens, times=1):
+        """
+        统计一条文本的分词结果，times: 这条文本的出现次数（去重后统计时大于1）
+        """
+        token_ids = self.token_ids
+        word_counts = self.word_counts
+        counts = self.ngram_counts
+        max_n = self.max_n
+        window = []  # 最近连续的有效词语编号，最多 max_n 个
+        for token in tokens:
+            word_id = token_ids.get(token)
+            if word_id is None:
+                word_id = self.token_id(token)
+            if word_id < 0:
+                window.clear()
+                continue
+            word_counts[word_id] += times
+            self.total_words += times
+            window.append(word_id)
+            if len(window) > max_n:
+                del window[0]
+            for n in range(len(window) - 1, 0, -1):
+                key = tuple(window[-n - 1:])
+                counts[key] = counts.get(key, 0) + times
+
+        if len(counts) > self.max_entries:
+            self.prune()
+
+    def prune(self):
+        """
+        删掉出现次数最少的词组，只保留出现次数最多的 max_entries 的一半
+        每次都按当前的次数分布决定删到多少次，不受以前剪枝的影响
+        """
+        counts = self.ngram_counts
+        keep = max(self.max_entries // 2, 1)
+        if len(counts) <= keep:
+            return
+        # 第 keep 多的次数：比它多的都保留，与它相同的按第一次出现的先后保留到 keep 个
+        cutoff = sorted(counts.values(), reverse=True)[keep - 1]
+        room = keep - sum(1 for count in counts.values() if count > cutoff)
+        # 重建字典而不是逐个删除，删除后字典占用的内存不会缩小
+        kept = {}
+        for key, count in counts.items():
+            if count > cutoff:
+                kept[key] = count
+            elif count == cutoff and room > 0:
+                kept[key] = count
+                room -= 1
+        self.ngram_counts = kept
+        self.pruned += len(counts) - len(kept)
+        self.count_error += cutoff
+
+    def pmi(self, key, count):
+        """
+        词组的点互信息 log2(P(词组) / ∏P(词语))，概率都按有效词语总数计算
+        越大说明这几个词越常一起出现，而不是因为各自常见才偶然相邻
+        """
+        expected = 1.0
+        for word_id in key:
+            expected *= self.word_counts[word_id] / self.total_words
+        return math.log2(count / self.total_words / expected)
+
+    def phrases(self, min_count=NGRAM_MIN_COUNT, min_pmi=None):
+        """
+        返回 [(词组, 出现次数, PMI, 词数)]，按出现次数从多到少排列（次数相同时按第一次出现的先后）
+        词组中的词语直接连起来（中文词语之间没有空格）；min_pmi 不为 None 时只保留 PMI 不低于它的词组
+        """
+        words = self.words
+        rows = []
+        for key, count in self.ngram_counts.items():
+            if count < min_count:
+                continue
+            pmi = self.pmi(key, count)
+            if min_pmi is not None and pmi < min_pmi:
+                continue
+            rows.append((''.join(words[word_id] for word_id in key), count, round(pmi, 3), len(key)))
+        rows.sort(key=itemgetter(1), reverse=True)
+        return rows
+
+def get_phrase_weights(phrase_rows, score="count"):
+    """
+    词组词云中每个词组的权重：score="count" 用出现次数，"pmi" 用互信息（只保留大于0的）
+    不同的切分连起来是同样文字时合并（次数相加，PMI取较大的）
+    """
+    weights = Counter()
+    for phrase, count, pmi, _ in phrase_rows:
+        if score == "pmi":
+            if pmi > 0:
+                weights[phrase] = max(weights[phrase], pmi)
+        else:
+            weights[phrase] += count
+    return weights
+
+# ============================================
+# 第五部分：词云生成
+# ============================================
+
+def enhance_frequency_distribution(word_counts, exponent=1.5, use_log_scale=True, top_n=None):
+    """
+    增强词频分布（NumPy向量化计算）
+    top_n: 只处理出现次数最多的 top_n 个词（词云最多只显示 max_words 个词），
+           缩放范围仍按全部词语的最小/最大频次计算，这些词的结果与不截断时相同
+    """
+    if not word_counts:
+        return {}
+
+    if len(word_counts) < 2:
+        return word_counts
+
+    import numpy as np
+
+    if top_n is not None and top_n < len(word_counts):
+        top_items = heapq.nlargest(top_n, word_counts.items(), key=itemgetter(1))
+        words = [word for word, _ in top_items]
+        freqs = np.array([freq for _, freq in top_items], dtype=np.float64)
+        # 全部词语的频次范围（增强函数是单调的，端点决定增强后的范围）
+        bounds = np.array([min(word_counts.values()), max(word_counts.values())], dtype=np.float64)
+    else:
+        words = list(word_counts.keys())
+        freqs = np.fromiter(word_counts.values(), dtype=np.float64, count=len(word_counts))
+        bounds = freqs
+
+    def enhance(values):
+        # 不同的频次值很少，只对每个不同的值计算一次，结果与逐个词计算完全相同
+        unique_values, inverse = np.unique(values, return_inverse=True)
+        if use_log_scale:
+            unique_enhanced = [math.log(value + 1) ** exponent for value in unique_values.tolist()]
+        else:
+            unique_enhanced = [value ** exponent for value in unique_values.tolist()]
+        return np.array(unique_enhanced, dtype=np.float64)[inverse]
+
+    enhanced = enhance(freqs)
+    enhanced_bounds = enhanced if bounds is freqs else enhance(bounds)
+    min_enhanced = enhanced_bounds.min()
+    max_enhanced = enhanced_bounds.max()
+
+    # 缩放到1-100范围
+    if max_enhanced > min_enhanced:
+        scaled = 1 + 99 * (enhanced - min_enhanced) / (max_enhanced - min_enhanced)
+    else:
+        scaled = np.full(len(words), 50.0)
+
+    return dict(zip(words, scaled.tolist()))
+
+def analyze_word_frequency_distribution(word_counts):
+    """
+    分析词频分布
+    """
+    if not word_counts:
+        return
+
+    frequencies = list(word_counts.values())
+    frequencies.sort(reverse=True)
+
+    print("\n" + "="*50)
+    print("词频分布分析:")
+    print("="*50)
+
+    if len(frequencies) > 0:
+        print(f"最高频词: {frequencies[0]} 次")
+        print(f"最低频词: {frequencies[-1]} 次")
+        print(f"词频极差: {frequencies[0] - frequencies[-1]}")
+
+    if len(frequencies) >= 10:
+        print(f"前10%的词频: {frequencies[:len(frequencies)//10]}")
+        print(f"后10%的词频: {frequencies[-len(frequencies)//10:]}")
+
+    # 计算基尼系数（衡量不均衡程度）
+    total = sum(frequencies)
+    if total > 0:
+        cumulative_sum = 0
+        gini_sum = 0
+        n = len(frequencies)
+
+        for i, freq in enumerate(sorted(frequencies)):
+            cumulative_sum += freq
+            gini_sum += (i + 1) * freq
+
+        gini = (2 * gini_sum) / (n * total) - (n + 1) / n
+        print(f"基尼系数: {gini:.3f} (越接近1表示分布越不均衡)")
+
+    print("="*50)
+
+def rank_cjk_fonts(font_paths):
+    """
+    从字体文件中挑出文件名像中文字体的，按 CJK_FONT_NAME_HINTS 的顺序排列
+    """
+    ranked = []
+    for font_path in font_paths:
+        name = re.sub(r'[\s_-]+', '', os.path.basename(font_path).lower())
+        for rank, hint in enumerate(CJK_FONT_NAME_HINTS):
+            if hint in name:
+                ranked.append((rank, font_path))
+                break
+    return [font_path for _, font_path in sorted(ranked)]
+
+def list_fontconfig_cjk_fonts():
+    """
+    用 fontconfig（fc-list）列出支持中文的字体文件，没有 fontconfig 时返回空列表
+    """
+    if not shutil.which("fc-list"):
+        return []
+    try:
+        output = subprocess.run(["fc-list", ":lang=zh", "file"], capture_output=True,
+                                text=True, timeout=30).stdout
+    except (OSError, subprocess.SubprocessError):
+        return []
+    return sorted(line.strip().rstrip(':') for line in output.splitlines() if line.strip())
+
+def scan_cjk_font():
+    """
+    在系统字体中查找中文字体，找不到时返回 None
+    优先用 fontconfig（按字体实际支持的语言筛选），否则扫描系统字体目录按文件名匹配
+    """
+    fontconfig_fonts = list_fontconfig_cjk_fonts()
+    if fontconfig_fonts:
+        # fontconfig 列出的都支持中文，文件名认识的排在前面
+        ranked = rank_cjk_fonts(fontconfig_fonts)
+        return ranked[0] if ranked else fontconfig_fonts[0]
+
+    from matplotlib import font_manager
+    ranked = rank_cjk_fonts(font_manager.findSystemFonts())
+    return ranked[0] if ranked else None
+
+def load_font_cache(cache_path):
+    """
+    读取上次找到的字体路径，缓存不存在、损坏或字体已被删除时返回 None
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            font_path = json.load(f).get("font_path")
+    except (OSError, ValueError, AttributeError):
+        return None
+    if isinstance(font_path, str) and os.path.exists(font_path):
+        return font_path
+    return None
+
+def save_font_cache(cache_path, font_path):
+    """
+    保存找到的字体路径
+    """
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({"font_path": font_path, "platform": platform.system()}, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"无法保存字体缓存 {cache_path}: {e}")
+
+@lru_cache(maxsize=None)
+def find_chinese_font(cache_path=FONT_CACHE_FILE):
+    """
+    查找可用的中文字体，找不到时返回 None
+    依次检查 POSSIBLE_FONTS、字体缓存，最后扫描系统字体并把结果写入缓存；
+    同一进程中只查找一次
+    cache_path: 字体缓存文件，None=不使用缓存
+    """
+    for font in POSSIBLE_FONTS:
+        if os.path.exists(font):
+            print(f"使用字体: {font}")
+            return font
+
+    font_path = load_font_cache(cache_path) if cache_path else None
+    if font_path:
+        print(f"使用字体: {font_path} (缓存)")
+        return font_path
+
+    font_path = scan_cjk_font()
+    if font_path:
+        print(f"使用字体: {font_path}")
+        if cache_path:
+            save_font_cache(cache_path, font_path)
+        return font_path
+
+    print("警告：未找到中文字体，词云可能无法显示中文")
+    print("  Linux 可以安装 fonts-noto-cjk 或 fonts-wqy-microhei 字体包")
+    return None
+
+@lru_cache(maxsize=None)
+def get_chart_font():
+    """
+    让 matplotlib 图表使用与词云相同的中文字体（标题、坐标轴等默认字体），
+    返回设置刻度标签时用的 fontproperties；找不到中文字体时返回 'SimHei'
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib import font_manager
+
+    font_path = find_chinese_font()
+    if not font_path:
+        return 'SimHei'
+    try:
+        font_manager.fontManager.addfont(font_path)
+        font = font_manager.FontProperties(fname=font_path)
+        font_name = font.get_name()
+    except Exception as e:
+        print(f"图表无法使用字体 {font_path}: {e}")
+        return 'SimHei'
+
+    plt.rcParams['font.sans-serif'] = [font_name] + [name for name in plt.rcParams['font.sans-serif']
+                                                     if name != font_name]
+    plt.rcParams['font.family'] = 'sans-serif'
+    plt.rcParams['axes.unicode_minus'] = False  # 中文字体中通常没有 Unicode 负号
+    return font
+
+def make_wordcloud(font_path=None, max_words=200, background_color="white", width=1000, height=800,
+                   font_size_range=(8, 120), relative_scaling=0.8, colormap="viridis"):
+    """
+    创建还没有布局的词云对象，可以用 layout_wordcloud 反复布局不同的词频
+    """
+    from wordcloud import WordCloud
+
+    return WordCloud(
+        font_path=font_path,
+        width=width,
+        height=height,
+        background_color=background_color,
+        max_words=max_words,
+        max_font_size=font_size_range[1],
+        min_font_size=font_size_range[0],
+        relative_scaling=relative_scaling,
+        random_state=WORDCLOUD_RANDOM_SEED,
+        collocations=False,
+        colormap=colormap,
+        prefer_horizontal=0.9,  # 水平词的比例
+        scale=2,  # 生成图片的缩放比例
+        contour_width=0,  # 轮廓宽度
+        contour_color='steelblue',  # 轮廓颜色
+    )
+
+def render_wordcloud(word_counts, font_path=None, max_words=200, background_color="white",
+                     width=1000, height=800, font_size_range=(8, 120), exponent=1.8,
+                     use_log_scale=True, relative_scaling=0.8, colormap="viridis",
+                     profiler=None, stage_suffix=""):
+    """
+    增强词频分布后生成词云对象
+    只有前 max_words 个词会被画出来，只对这些词做增强和布局
+    profiler: PipelineProfiler，分别记录增强（enhance）和布局（layout）两个阶段
+    """
+    with profile_stage(profiler, "enhance" + stage_suffix, len(word_counts)):
+        enhanced_counts = enhance_frequency_distribution(
+            word_counts,
+            exponent=exponent,
+            use_log_scale=use_log_scale,
+            top_n=max_words
+        )
+
+    wc = make_wordcloud(font_path, max_words, background_color, width, height,
+                        font_size_range, relative_scaling, colormap)
+
+    with profile_stage(profiler, "layout" + stage_suffix, len(enhanced_counts)):
+        wc.generate_from_frequencies(enhanced_counts)
+    return wc
+
+def layout_wordcloud(wc, enhanced_counts):
+    """
+    用词云对象布局一组（已增强的）词频
+    词云对象内部的随机数生成器每次布局后状态都会改变，先重置种子，
+    复用同一个对象时每张图都与新建对象生成的完全相同
+    """
+    wc.random_state = random.Random(WORDCLOUD_RANDOM_SEED)
+    return wc.generate_from_frequencies(enhanced_counts)
+
+UNSAFE_FILENAME_REGEX = re.compile(r'[\\/:*?"<>|\s]+')
+
+def get_render_filename(name, index=None):
+    """
+    词云图片的文件名：把文件名中不能使用的字符换成下划线，
+    index 不为 None 时在前面加上三位编号（名字清理后可能重复，编号保证文件名不同）
+    """
+    safe_name = UNSAFE_FILENAME_REGEX.sub('_', str(name)).strip('._') or "unnamed"
+    if index is None:
+        return f"{safe_name}.png"
+    return f"{index:03d}_{safe_name}.png"
+
+def make_render_jobs(named_counts, output_dir, numbered=False):
+    """
+    为一组词频生成 render_wordclouds 的任务，文件名只取决于名字（和顺序），每次运行都相同
+    named_counts: [(名字, 词频), ...]，词频为空的跳过（编号仍按原顺序）
+    numbered: 是否在文件名前加上从1开始的编号
+    """
+    return [(word_counts, os.path.join(output_dir, get_render_filename(name, index if numbered else None)))
+            for index, (name, word_counts) in enumerate(named_counts, 1) if word_counts]
+
+def split_render_options(render_options):
+    """
+    把 render_wordcloud 的参数分成 (增强参数, make_wordcloud 的参数)
+    """
+    cloud_options = dict(render_options)
+    enhance_options = {
+        "exponent": cloud_options.pop("exponent", 1.8),
+        "use_log_scale": cloud_options.pop("use_log_scale", True),
+        "top_n": cloud_options.get("max_words", 200),
+    }
+    return enhance_options, cloud_options
+
+# 进程池中每个进程只创建一次词云对象，之后的任务都复用它（省去每张图创建对象和传递参数；
+# 字体文件仍由 wordcloud 在布局和绘制时按每个字号重新打开）
+worker_wordcloud = None
+
+def init_render_worker(cloud_options):
+    """
+    进程池的初始化函数
+    """
+    global worker_wordcloud
+    worker_wordcloud = make_wordcloud(**cloud_options)
+
+def layout_wordcloud_to_file(enhanced_counts, output_image):
+    """
+    用本进程的词云对象布局已增强的词频并保存图片，可以放在进程池中运行
+    """
+    layout_wordcloud(worker_wordcloud, enhanced_counts)
+    worker_wordcloud.to_file(output_image)
+    return output_image
+
+def render_wordclouds(jobs, workers=1, **render_options):
+    """
+    批量生成并保存词云图片，按 jobs 的顺序产出 (图片路径, 异常)，成功时异常为 None
+    jobs: [(词频, 图片路径), ...]，可以用 make_render_jobs 生成
+    workers: 并行进程数，1=逐张生成，None=使用全部CPU核心（每张图的布局互不影响，可以并行）
+    词频增强在当前进程完成，只把前 max_words 个词传给子进程；
+    每个子进程只创建一次词云对象并复用（字体不会因此少加载），生成的图片与逐张调用 render_wordcloud 相同
+    """
+    enhance_options, cloud_options = split_render_options(render_options)
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+
+    if workers <= 1:
+        wc = make_wordcloud(**cloud_options)
+        for word_counts, output_image in jobs:
+            try:
+                layout_wordcloud(wc, enhance_frequency_distribution(word_counts, **enhance_options))
+                wc.to_file(output_image)
+                yield output_image, None
+            except Exception as e:
+                yield output_image, e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker,
+                             initargs=(cloud_options,)) as executor:
+        futures = []
+        for word_counts, output_image in jobs:
+            try:
+                enhanced_counts = enhance_frequency_distribution(word_counts, **enhance_options)
+                futures.append((output_image, executor.submit(layout_wordcloud_to_file,
+                                                              enhanced_counts, output_image)))
+            except Exception as e:
+                futures.append((output_image, e))
+        for output_image, future in futures:
+            if isinstance(future, Exception):
+                yield output_image, future
+                continue
+            try:
+                yield future.result(), None
+            except Exception as e:
+                yield output_image, e
+
+# ============================================
+# 第六部分：结果保存和显示
+# ============================================
+
+def write_frequency_csv(rows, columns, output_path):
+    """
+    逐行写入词频CSV，不需要先构建 DataFrame
+    rows: 每行一个元组的可迭代对象，如 word_counts.most_common()
+    编码（utf-8-sig）、换行和引号规则都与 DataFrame.to_csv 相同，输出的文件完全一样
+    """
+    with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+def write_frequency_parquet(rows, columns, output_path, dictionary=False,
+                            compression=PARQUET_COMPRESSION, batch_size=PARQUET_BATCH_SIZE):
+    """
+    把词频写成压缩的 Parquet 列式文件（需要安装 pyarrow），分析工具可以只读需要的列
+    dictionary: 文本列（词语、时间段、发送者）是否用字典编码，适合同一个值出现很多次的长表，
+                读回 pandas 时是 category 类型
+    每次只转换 batch_size 行，内存占用与总行数无关
+    返回是否写入成功，没有安装 pyarrow 时返回 False
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("提示：没有安装 pyarrow，跳过 Parquet 输出（pip install pyarrow）")
+        return False
+
+    writer = None
+    try:
+        for batch in iter_batches(rows, batch_size):
+            arrays = []
+            for i in range(len(columns)):
+                # 按列取值时用列表推导，zip(*batch) 展开大量参数非常慢
+                column = pa.array([row[i] for row in batch])
+                if dictionary and pa.types.is_string(column.type):
+                    column = column.dictionary_encode()
+                arrays.append(column)
+            table = pa.Table.from_arrays(arrays, names=list(columns))
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema, compression=compression)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return writer is not None
+
+def get_parquet_path(output_stats):
+    """
+    与词频统计CSV同名的 Parquet 文件路径
+    """
+    return os.path.splitext(output_stats)[0] + ".parquet"
+
+def save_frequency_table(rows, columns, output_stats, parquet=False, dictionary=None):
+    """
+    保存词频统计CSV，parquet=True 时再保存一份同名的 Parquet 文件
+    rows 会被读两遍，需要是列表
+    dictionary: Parquet 文本列是否用字典编码，None=多于两列（分组的长表）时使用
+    """
+    write_frequency_csv(rows, columns, output_stats)
+    if parquet:
+        parquet_path = get_parquet_path(output_stats)
+        # 分组的长表（每个时间段、发送者一组）中同一个词出现很多次，用字典编码；
+        # 总词频表中每个词只出现一次，字典编码只会更慢
+        if dictionary is None:
+            dictionary = len(columns) > 2
+        if write_frequency_parquet(rows, columns, parquet_path, dictionary=dictionary):
+            print(f"Parquet 文件已保存: {parquet_path}")
+
+def save_enhanced_results(wordcloud, word_counts, output_image, output_stats, parquet=False):
+    """
+    保存词云图片和词频统计
+    parquet: 是否同时保存 Parquet 格式的词频统计
+    """
+    if not wordcloud:
+        return False
+
+    # 保存词云图片
+    try:
+        wordcloud.to_file(output_image)
+        print(f"词云图片已保存: {output_image}")
+    except Exception as e:
+        print(f"保存图片失败: {e}")
+        return False
+
+    # 保存词频统计（排序只做一次，直接从排好序的列表写文件和显示）
+    try:
+        sorted_counts = word_counts.most_common()
+        save_frequency_table(sorted_counts, ['词语', '频次'], output_stats, parquet)
+        print(f"词频统计已保存: {output_stats}")
+
+        # 显示前20个词
+        print("\n词频前20名:")
+        for i, (word, freq) in enumerate(sorted_counts[:20]):
+            print(f"  {i+1:2d}. {word:10s}: {freq:4d}次")
+
+        # 计算并显示差异统计
+        if len(sorted_counts) >= 2:
+            max_word, max_freq = sorted_counts[0]
+            min_word, min_freq = sorted_counts[-1]
+            ratio = max_freq / min_freq if min_freq > 0 else 0
+            print(f"\n词频差异统计:")
+            print(f"  最高频词 '{max_word}': {max_freq} 次")
+            print(f"  最低频词 '{min_word}': {min_freq} 次")
+            print(f"  频次比: {ratio:.1f}:1")
+
+    except Exception as e:
+        print(f"保存词频统计失败: {e}")
+
+    return True
+
+def display_enhanced_wordcloud(wordcloud, word_counts, title, params_text, output_image=None):
+    """
+    显示词云和高频词排行榜
+    wordcloud: 词云对象，或已经生成的词云图片（图像数组）
+    output_image: 不为 None 时把整张图保存到这个文件，不弹出窗口（无界面批处理时使用）
+    """
+    if wordcloud is None:
+        return
+
+    import matplotlib.pyplot as plt
+
+    chart_font = get_chart_font()
+
+    # 创建子图
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 8))
+
+    # 左图：词云
+    ax1.imshow(wordcloud, interpolation="bilinear")
+    ax1.axis("off")
+    ax1.set_title(title, fontsize=16, fontweight='bold')
+
+    # 添加参数信息
+    ax1.text(0.02, 0.98, params_text,
+             transform=ax1.transAxes,
+             verticalalignment='top',
+             bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8),
+             fontsize=9)
+
+    # 右图：词频分布柱状图
+    if word_counts and len(word_counts) > 0:
+        # 获取前20个高频词
+        top_words = dict(word_counts.most_common(20))
+
+        words = list(top_words.keys())
+        freqs = list(top_words.values())
+
+        # 创建水平柱状图
+        y_pos = range(len(words))
+        bars = ax2.barh(y_pos, freqs, align='center', alpha=0.7, color='steelblue')
+        ax2.set_yticks(y_pos)
+        ax2.set_yticklabels(words, fontproperties=chart_font)
+        ax2.invert_yaxis()  # 最高的在顶部
+        ax2.set_xlabel('出现次数')
+        ax2.set_title('高频词排行榜（前20）')
+
+        # 在柱状图上显示数值
+        for i, (bar, freq) in enumerate(zip(bars, freqs)):
+            width = bar.get_width()
+            ax2.text(width + max(freqs)*0.01, bar.get_y() + bar.get_height()/2,
+                    f'{freq}', va='center', fontsize=9)
+
+    plt.suptitle(f"词云分析结果 - 共 {len(word_counts)} 个不同词语", fontsize=14)
+    plt.tight_layout()
+    if output_image:
+        fig.savefig(output_image, dpi=100)
+        plt.close(fig)
+    else:
+        plt.show()
+
+# ============================================
+# 第七部分：性能统计
+# ============================================
+
+def get_peak_rss_mb():
+    """
+    当前进程的内存占用峰值（MB），无法获取时返回 None
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux的单位是KB，macOS是字节
+        if sys.platform == 'darwin':
+            peak /= 1024
+        return peak / 1024
+
+    # Windows没有resource模块，装了psutil时用它读取峰值工作集
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss) / 1024 / 1024
+
+def get_children_peak_rss_mb():
+    """
+    已结束的子进程（并行分词、进程池读取）中内存占用最大的一个（MB），无法获取时返回 None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return peak / 1024
+
+def get_profile_path(output_stats):
+    """
+    性能报告的文件名：放在词频统计文件旁边，如 word_frequency.csv -> word_frequency_profile.json
+    """
+    return os.path.splitext(output_stats)[0] + "_profile.json"
+
+class PipelineProfiler:
+    """
+    记录各处理阶段（读取、过滤、清洗、分词、统计、增强、布局、保存）的耗时和内存峰值，
+    最后保存为JSON报告，方便对比不同版本和估算需要的硬件
+    """
+
+    def __init__(self, script_name, settings=None):
+        self.script_name = script_name
+        self.settings = settings or {}
+        self.stages = []
+        self.messages = 0  # 读取的消息总数，用于计算整体吞吐量
+        self.started_at = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, items=None):
+        """
+        记录一个阶段，items 为该阶段处理的条数（消息、文本或词语数）
+        阶段内可以通过 record["items"] = n 在处理完后再填写条数
+        """
+        record = {"name": name, "items": items}
+        peak_before = get_peak_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            peak_after = get_peak_rss_mb()
+            items = record["items"]
+            record["seconds"] = round(seconds, 4)
+            record["items_per_sec"] = round(items / seconds, 1) if items and seconds > 0 else None
+            record["peak_rss_mb"] = round(peak_after, 1) if peak_after is not None else None
+            # 这个阶段把内存峰值抬高了多少，0表示没有超过之前的峰值
+            if peak_before is not None and peak_after is not None:
+                record["peak_rss_growth_mb"] = round(peak_after - peak_before, 1)
+            else:
+                record["peak_rss_growth_mb"] = None
+            self.stages.append(record)
+
+    def build_report(self):
+        """
+        汇总成可以写入JSON的字典
+        """
+        import jieba
+
+        total_seconds = time.perf_counter() - self.start
+        peak = get_peak_rss_mb()
+        children_peak = get_children_peak_rss_mb()
+        return {
+            "script": self.script_name,
+            "started_at": self.started_at,
+            "total_seconds": round(total_seconds, 4),
+            "messages": self.messages,
+            "messages_per_sec": round(self.messages / total_seconds, 1) if total_seconds > 0 else None,
+            "peak_rss_mb": round(peak, 1) if peak is not None else None,
+            "children_peak_rss_mb": round(children_peak, 1) if children_peak is not None else None,
+            "stages": self.stages,
+            "settings": self.settings,
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "jieba": jieba.__version__,
+            },
+        }
+
+    def print_summary(self):
+        """
+        在控制台打印各阶段耗时
+        """
+        print("\n各阶段耗时:")
+        for record in self.stages:
+            line = f"  {record['name']:20s} {record['seconds']:8.3f} 秒"
+            if record["items_per_sec"]:
+                line += f"  {record['items_per_sec']:12,.0f} 条/秒"
+            if record["peak_rss_mb"] is not None:
+                line += f"  内存峰值 {record['peak_rss_mb']:.0f} MB"
+            print(line)
+
+    def save_report(self, path):
+        """
+        保存JSON报告，返回报告内容；保存失败时只打印警告
+        """
+        report = self.build_report()
+        self.print_summary()
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"性能报告已保存: {path}")
+        except OSError as e:
+            print(f"保存性能报告失败: {e}")
+        return report
+
+def profile_stage(profiler, name, items=None):
+    """
+    profiler 为 None 时什么都不记录，方便在公共函数里可选地统计耗时
+    """
+    if profiler is None:
+        return nullcontext({"items": items})
+    return profiler.stage(name, items)
@@ -12,6 +12,12 @@ import os
 import sys
 import time
 import traceback
+import marshal
+import hashlib
+
+# jieba词典缓存的文件夹和版本号（缓存格式变化时加一）
+JIEBA_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".vocabulary_replacer_jieba")
+JIEBA_CACHE_VERSION = 1
 
 def show_message(title, message, is_error=False):
     """显示Windows消息框"""
@@ -24,10 +30,46 @@ def show_message(title, message, is_error=False):
     except:
         pass  # 如果弹窗失败，静默处理
 
+def init_jieba():
+    """加载jieba词典（与jieba自带的词典相同，分词结果不变），建好的词典缓存在用户目录，下次启动直接读取"""
+    # jieba版本或词典文件（包括 jieba.set_dictionary 换的词典）变了都会重建缓存
+    dictionary = jieba.dt.dictionary or os.path.join(os.path.dirname(jieba.__file__), jieba.DEFAULT_DICT_NAME)
+    try:
+        info = os.stat(dictionary)
+        dictionary_version = f"{info.st_size}-{info.st_mtime_ns}"
+    except OSError:
+        dictionary_version = "missing"
+    key = "\n".join([str(JIEBA_CACHE_VERSION), jieba.__version__, os.path.abspath(dictionary),
+                     dictionary_version])
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+    cache_path = os.path.join(JIEBA_CACHE_DIR, f"jieba_v{JIEBA_CACHE_VERSION}_{digest}.cache")
+    
+    # 整个文件读入内存再解析，比jieba自带缓存的 marshal.load(文件) 快得多
+    try:
+        with open(cache_path, 'rb') as f:
+            freq, total = marshal.loads(f.read())
+        jieba.dt.FREQ, jieba.dt.total = freq, total
+        jieba.dt.initialized = True
+        return
+    except (OSError, EOFError, ValueError, TypeError):
+        pass  # 没有缓存或缓存损坏，重新建词典
+    
+    jieba.initialize()
+    
+    try:
+        os.makedirs(JIEBA_CACHE_DIR, exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            marshal.dump((jieba.dt.FREQ, jieba.dt.total), f)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass  # 缓存写不进去不影响使用
+
 class VocabularyReplacer:
     def __init__(self, vocab_file="词汇.json"):
         self.vocab_dict = {}
         self.load_vocabulary(vocab_file)
+        init_jieba()
     
     def load_vocabulary(self, vocab_file):
         """加载词汇库JSON文件"""